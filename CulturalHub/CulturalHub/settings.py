@@ -43,12 +43,17 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'culturalhub_app.middleware.CompressionMiddleware',
+    'culturalhub_app.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'culturalhub_app.middleware.IdentityMapMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'culturalhub_app.middleware.PageViewMiddleware',
+    'culturalhub_app.middleware.SnapshotMiddleware',
 ]
 
 ROOT_URLCONF = 'CulturalHub.urls'
@@ -82,9 +87,26 @@ DATABASES = {
         'NAME': 'culturalhub',
         'USER': 'postgres',
         'PASSWORD': 'coderslab',
+        # Keep connections open between requests. Connections belong to the thread which opened them, so
+        # the warm-up only opens them for sync workers, which serve requests in the thread it runs in; threaded
+        # workers open one per thread on its first request. Under ASGI (uvicorn workers) set 0 and use a
+        # connection pooler such as PgBouncer instead, persistent connections aren't reused reliably there.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas
+# Aliases from DATABASES that receive the reads of GET views. For local testing two SQLite
+# files can be used, e.g. DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3',
+# 'NAME': BASE_DIR / 'replica.sqlite3', 'TEST': {'MIRROR': 'default'}} and DATABASE_REPLICAS = ['replica'].
+
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['culturalhub_app.db_router.PrimaryReplicaRouter']
+
+# Seconds during which a user's reads stick to the primary after they wrote something.
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -122,11 +144,149 @@ LOGIN_URL = 'login'
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# collectstatic fingerprints the files into a manifest and writes their gzip variants
+# (and brotli variants when the optional brotli package is installed).
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'culturalhub_app.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Responses and static files smaller than this number of bytes are not compressed.
+COMPRESSION_MIN_SIZE = 1024
+
+# Uploaded files
+# Uploads are always streamed to temporary files instead of being buffered in memory.
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Thumbnails rendered for uploaded images, as (width, height), and the number of processes rendering them.
+THUMBNAIL_SIZES = {
+    'avatar': (128, 128),
+    'small': (160, 120),
+    'large': (640, 480),
+}
+THUMBNAIL_WORKERS = 2
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Search autocomplete
+# Seconds after which a worker rebuilds its in-memory index to pick up changes made by other workers.
+
+AUTOCOMPLETE_REBUILD_SECONDS = 600
+
+# Content rating
+# Bayesian prior of the ranking score: new items start at RATING_PRIOR_MEAN,
+# as if they had RATING_PRIOR_WEIGHT votes of that value.
+
+RATING_PRIOR_MEAN = 3.0
+RATING_PRIOR_WEIGHT = 5
+
+# Activity feed
+# Authors with more followers and interests of more users than FEED_FANOUT_LIMIT are merged into the feeds of
+# these users when read instead of being copied into each of them (run recount_interests periodically to keep
+# the numbers of users of interests exact). Feeds are capped at FEED_MAX_ITEMS items.
+
+FEED_FANOUT_LIMIT = 10000
+FEED_MAX_ITEMS = 500
+FEED_BATCH_SIZE = 500
+FEED_PAGE_SIZE = 20
+
+# Email
+# Comment notifications are collected and sent as digests by the send_comment_digests command.
+# For local testing use e.g. EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# with EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'.
+
+DEFAULT_FROM_EMAIL = 'CulturalHub <noreply@culturalhub.local>'
+SITE_URL = 'http://127.0.0.1:8000'
+COMMENT_DIGEST_BATCH_SIZE = 100
+COMMENT_DIGEST_MAX_ITEMS = 20
+
+# Deleted content
+# Deleted content is hidden immediately and removed by the purge_deleted_content command,
+# which deletes related rows PURGE_BATCH_SIZE at a time.
+
+PURGE_BATCH_SIZE = 1000
+PURGE_GRACE_SECONDS = 3600
+
+# Batch content editing
+# Maximum number of content items created or updated with one request to the batch endpoint.
+
+CONTENT_BATCH_MAX_ITEMS = 200
+
+# Page snapshots
+# Category, content and profile pages are pre-rendered to SNAPSHOT_ROOT by the generate_snapshots command
+# in SNAPSHOT_WORKERS processes and served from there to anonymous visitors.
+
+SNAPSHOT_ROOT = BASE_DIR / 'snapshots'
+SNAPSHOT_WORKERS = 2
+SNAPSHOT_BATCH_SIZE = 200
+
+# Page views
+# Views of content and profile pages are counted in memory by each worker and added to the database by
+# a background thread every PAGE_VIEW_FLUSH_SECONDS or PAGE_VIEW_FLUSH_THRESHOLD views, whichever comes first;
+# a crashing worker loses at most that many views.
+
+PAGE_VIEW_FLUSH_SECONDS = 10
+PAGE_VIEW_FLUSH_THRESHOLD = 1000
+PAGE_VIEW_BATCH_SIZE = 500
+
+# Revision history
+# Edits of content titles and descriptions are kept as compressed reverse deltas. Every REVISION_KEYFRAME_INTERVAL-th
+# revision stores the full text, so restoring any revision applies a bounded number of deltas. Only the latest
+# REVISION_HISTORY_LIMIT revisions of an item are kept.
+
+REVISION_HISTORY_LIMIT = 100
+REVISION_KEYFRAME_INTERVAL = 20
+REVISIONS_PER_PAGE = 20
+
+# Cache
+# The default cache keeps recently used values in the memory of each worker (at most LOCAL_TIMEOUT seconds)
+# in front of the 'shared' cache. Writes reach the other workers within INVALIDATION_POLL_SECONDS.
+# The shared cache has to increment counters atomically, which Redis and Memcached do but the file based and
+# database caches don't. For a single process, e.g. local development, 'django.core.cache.backends.locmem.LocMemCache'
+# can be used instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'culturalhub_app.cache.TwoTierCache',
+        'LOCATION': 'shared',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'LOCAL_MAX_BYTES': 16 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 5,
+            'INVALIDATION_POLL_SECONDS': 0.5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379',
+        'TIMEOUT': 300,
+    },
+}
+
+# Duplicate content
+# New content whose title and description are at least DUPLICATE_SIMILARITY_THRESHOLD similar (estimated Jaccard
+# similarity of their word sequences) to existing content is rejected with DUPLICATE_ACTION = 'block', or posted only
+# after the author confirmed it with 'warn'. Existing duplicates are listed by the cluster_duplicates command.
+
+DUPLICATE_ACTION = 'warn'
+DUPLICATE_SIMILARITY_THRESHOLD = 0.8
+DUPLICATE_MAX_CANDIDATES = 200
+DUPLICATE_BATCH_SIZE = 1000
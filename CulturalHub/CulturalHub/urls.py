@@ -14,12 +14,16 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from culturalhub_app.views import (LoginView, RegisterView, MainPageView,
                                    UserProfileView, CategoryContentView, UserProfileEditView,
                                    logout_view, ContentView, ContentCreateView, EditContentView,
-                                   DeleteContentView, AddCommentView, SearchResultsView)
+                                   DeleteContentView, AddCommentView, SearchResultsView,
+                                   AutocompleteView, CommentThreadView, RateContentView,
+                                   ImageView, StaticFileView, FollowView, FeedView,
+                                   ContentBatchView, ContentHistoryView, RevisionDiffView, RestoreRevisionView)
 
 
 urlpatterns = [
@@ -28,15 +32,27 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('main/', MainPageView.as_view(), name='main-page'),
     path('user/<int:user_id>/', UserProfileView.as_view(), name='user'),
+    path('user/<int:user_id>/follow/', FollowView.as_view(), name='follow'),
+    path('feed/', FeedView.as_view(), name='feed'),
     path('category/<str:category>',CategoryContentView.as_view(), name='category'),
     path('edit/user/<int:user_id>', UserProfileEditView.as_view(), name='edit-user'),
     path('logout/', logout_view, name='logout'),
     path('content/<int:content_id>/', ContentView.as_view(), name='content-view'),
     path('content/create/', ContentCreateView.as_view(), name='create-content'),
+    path('content/batch/', ContentBatchView.as_view(), name='content-batch'),
     path('content/edit/<int:content_id>', EditContentView.as_view(), name='edit-content'),
+    path('content/<int:content_id>/history/', ContentHistoryView.as_view(), name='content-history'),
+    path('content/<int:content_id>/history/<int:number>/', RevisionDiffView.as_view(), name='revision-diff'),
+    path('content/<int:content_id>/history/<int:number>/restore/', RestoreRevisionView.as_view(),
+         name='restore-revision'),
     path('content/delete/<int:pk>', DeleteContentView.as_view(), name='content-delete'),
     path('content/add-comment/<int:content_id>/', AddCommentView.as_view(), name='add-comment'),
+    path('content/rate/<int:content_id>/', RateContentView.as_view(), name='rate-content'),
+    path('content/comment/<int:comment_id>/', CommentThreadView.as_view(), name='comment-thread'),
+    path('images/<str:size>/<path:name>', ImageView.as_view(), name='image'),
+    path(f'{settings.STATIC_URL.strip("/")}/<path:path>', StaticFileView.as_view(), name='static'),
     path('search-results/', SearchResultsView.as_view(), name='search-results'),
+    path('search/autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
 
 
 ]
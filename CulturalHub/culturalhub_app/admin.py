@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import UserProfile, Interest, Category, UserContent, Comment
+from django.contrib import admin, messages
+from .models import UserProfile, Interest, Category, UserContent, Comment, RatingVote
+from .revisions import edited_by
 # Register your models here.
 
 admin.site.register(Interest)
@@ -22,7 +23,33 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(UserContent)
 class UserContentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'description', 'date', 'location', 'author', 'category', 'display_interests', 'culture', 'rating')
+    list_display = ('title', 'description', 'date', 'location', 'author', 'category', 'display_interests', 'culture', 'rating', 'rating_count')
+    actions = ['soft_delete_selected']
+
+    def get_actions(self, request):
+        """
+        Replaces the built-in bulk delete, which loads every related comment into memory, with soft_delete_selected.
+        """
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Delete selected content', permissions=['delete'])
+    def soft_delete_selected(self, request, queryset):
+        deleted = queryset.soft_delete()
+        self.message_user(request, f'{deleted} content items have been deleted.', messages.SUCCESS)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Credits the edit to the profile of the admin in the revision history of the content.
+        """
+        super().save_model(request, edited_by(obj, getattr(request.user, 'userprofile', None)), form, change)
+
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        queryset.soft_delete()
 
     def display_interests(self, obj):
         return ", ".join([interest.name for interest in obj.interests.all()])
@@ -33,3 +60,8 @@ class UserContentAdmin(admin.ModelAdmin):
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('user', 'commented_content', 'text', 'created_at')
+
+
+@admin.register(RatingVote)
+class RatingVoteAdmin(admin.ModelAdmin):
+    list_display = ('user', 'content', 'value')
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class CulturalhubAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'culturalhub_app'
+
+    def ready(self):
+        """
+        Connects the signal receivers keeping the in-memory search structures up to date,
+        scheduling thumbnails of uploaded images, marking outdated page snapshots, indexing content
+        for duplicate detection and recording the revision history of content edits.
+        """
+        from culturalhub_app import autocomplete, duplicates, images, revisions, snapshots  # noqa: F401
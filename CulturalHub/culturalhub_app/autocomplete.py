@@ -0,0 +1,356 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from culturalhub_app.models import UserContent, Category, Interest, Comment, content_soft_deleted, content_batch_saved
+
+CONTENT, USER, CATEGORY, INTEREST = range(4)
+KIND_NAMES = ('content', 'user', 'category', 'interest')
+
+# Prefixes matching more entries than this keep their top MAX_RESULTS entries, which are updated
+# along with the entries, so searching them never scans their whole range.
+SCAN_LIMIT = 2000
+MAX_RESULTS = 50
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index used for search autocomplete.
+
+    Labels are kept in one list sorted by their lowercased form, so a prefix maps to a contiguous range
+    found with two bisections. Kinds, ids and scores are stored in parallel typed arrays instead of per-entry
+    objects, to keep the index small enough for millions of entries.
+    """
+    def __init__(self):
+        self._labels = []
+        self._kinds = bytearray()
+        self._ids = array('q')
+        self._scores = array('q')
+        # Label of each entry by item_key(kind, pk), to find the position of an entry.
+        self._label_by_item = {}
+        # Prefix -> its top (score, kind, pk, label) entries, best first, for prefixes matching over SCAN_LIMIT entries.
+        self._top = {}
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._labels)
+
+    @staticmethod
+    def item_key(kind, pk):
+        return pk << 3 | kind
+
+    def build(self, items):
+        """
+        Replaces the content of the index with the given (kind, pk, label, score) items.
+        """
+        rows = sorted(items, key=lambda item: item[2].lower())
+        with self._lock:
+            self._labels = [row[2] for row in rows]
+            self._kinds = bytearray(row[0] for row in rows)
+            self._ids = array('q', (row[1] for row in rows))
+            self._scores = array('q', (row[3] or 0 for row in rows))
+            self._label_by_item = {self.item_key(row[0], row[1]): row[2] for row in rows}
+            self._top = {}
+            self._fill_top('', 0, len(rows))
+            self.built_at = time.monotonic()
+
+    def _entry(self, position):
+        return self._scores[position], self._kinds[position], self._ids[position], self._labels[position]
+
+    def _range(self, prefix):
+        start = bisect_left(self._labels, prefix, key=str.lower)
+        return start, bisect_right(self._labels, prefix + '\uffff', lo=start, key=str.lower)
+
+    def _fill_top(self, prefix, start, end):
+        """
+        Returns the top entries of the range of a prefix. Ranges over SCAN_LIMIT entries are split by the next
+        character and their top entries merged from those of the parts, which are kept for later searches.
+        """
+        if end - start <= SCAN_LIMIT:
+            return heapq.nlargest(MAX_RESULTS, map(self._entry, range(start, end)))
+        cached = self._top.get(prefix)
+        if cached is not None:
+            return cached
+        parts, position, length = [], start, len(prefix)
+        while position < end:
+            label = self._labels[position].lower()
+            if len(label) == length:
+                parts.append([self._entry(position)])
+                position += 1
+                continue
+            child = label[:length + 1]
+            child_end = bisect_right(self._labels, child + '\uffff', lo=position, hi=end, key=str.lower)
+            parts.append(self._fill_top(child, position, child_end))
+            position = child_end
+        top = self._top[prefix] = heapq.nlargest(MAX_RESULTS, (entry for part in parts for entry in part))
+        return top
+
+    def _position(self, kind, pk):
+        label = self._label_by_item.get(self.item_key(kind, pk))
+        if label is None:
+            return None
+        position = bisect_left(self._labels, label.lower(), key=str.lower)
+        while self._ids[position] != pk or self._kinds[position] != kind:
+            position += 1
+        return position
+
+    def _update_top(self, label, old=None, new=None):
+        """
+        Replaces the old entry with the new one in the top entries of the prefixes of label.
+        Prefixes which lose an entry of their top drop it, to be recomputed from their parts when searched.
+        """
+        label = label.lower()
+        for length in range(len(label) + 1):
+            top = self._top.get(label[:length])
+            if top is None:
+                continue
+            if old in top:
+                if new is None or new < old:
+                    del self._top[label[:length]]
+                    continue
+                top.remove(old)
+            if new is not None and (len(top) < MAX_RESULTS or new > top[-1]):
+                top.append(new)
+                top.sort(reverse=True)
+                del top[MAX_RESULTS:]
+
+    def remove(self, kind, pk):
+        with self._lock:
+            position = self._position(kind, pk)
+            if position is None:
+                return
+            old = self._entry(position)
+            del self._labels[position]
+            del self._kinds[position]
+            del self._ids[position]
+            del self._scores[position]
+            del self._label_by_item[self.item_key(kind, pk)]
+            self._update_top(old[3], old=old)
+
+    def upsert(self, kind, pk, label, score=None):
+        """
+        Adds or updates a single entry. When score is None, the current score of the entry is kept.
+        """
+        with self._lock:
+            position = self._position(kind, pk)
+            if position is not None:
+                if score is None and self._labels[position] == label:
+                    return
+                if score is None:
+                    score = self._scores[position]
+                self.remove(kind, pk)
+            position = bisect_right(self._labels, label.lower(), key=str.lower)
+            self._labels.insert(position, label)
+            self._kinds.insert(position, kind)
+            self._ids.insert(position, pk)
+            self._scores.insert(position, score or 0)
+            self._label_by_item[self.item_key(kind, pk)] = label
+            self._update_top(label, new=self._entry(position))
+
+    def add_score(self, kind, pk, delta):
+        with self._lock:
+            position = self._position(kind, pk)
+            if position is None:
+                return
+            old = self._entry(position)
+            self._scores[position] += delta
+            self._update_top(old[3], old=old, new=self._entry(position))
+
+    def search(self, prefix, limit=10):
+        """
+        Returns up to limit (at most MAX_RESULTS) (kind, pk, label, score) entries starting with prefix,
+        most popular first.
+        """
+        prefix = prefix.lower()
+        if not prefix:
+            return []
+        with self._lock:
+            start, end = self._range(prefix)
+            top = self._fill_top(prefix, start, end)
+            return [(kind, pk, label, score) for score, kind, pk, label in top[:limit]]
+
+
+# Index of this worker, replaced by a rebuilt one every AUTOCOMPLETE_REBUILD_SECONDS.
+_index = None
+_build_lock = threading.Lock()
+# Changes made while the index is rebuilt, replayed on the new index before it replaces the current one;
+# None when no rebuild is running.
+_pending_updates = None
+_updates_lock = threading.Lock()
+
+
+def iter_index_items():
+    """
+    Yields the (kind, pk, label, score) items of the autocomplete index from the database.
+    Content is ranked by its number of comments, users by the content they shared,
+    categories and interests by the content tagged with them.
+    """
+    contents = UserContent.objects.annotate(popularity=Count('comment')).values_list('id', 'title', 'popularity')
+    for pk, title, score in contents.iterator():
+        yield CONTENT, pk, title, score
+    users = User.objects.annotate(popularity=Count('userprofile__usercontent')).values_list('id', 'username', 'popularity')
+    for pk, username, score in users.iterator():
+        yield USER, pk, username, score
+    for pk, name, score in Category.objects.annotate(popularity=Count('usercontent')).values_list('id', 'name', 'popularity'):
+        yield CATEGORY, pk, name, score
+    for pk, name, score in Interest.objects.annotate(popularity=Count('usercontent')).values_list('id', 'name', 'popularity'):
+        yield INTEREST, pk, name, score
+
+
+def get_index():
+    """
+    Returns the autocomplete index of this worker, building it on first use.
+    An index older than AUTOCOMPLETE_REBUILD_SECONDS is rebuilt in a background thread to pick up changes
+    made by other workers; it keeps serving searches until the new one replaces it.
+    """
+    global _index
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                index = PrefixIndex()
+                index.build(iter_index_items())
+                _index = index
+    elif time.monotonic() - _index.built_at > getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', 600):
+        start_rebuild()
+    return _index
+
+
+def start_rebuild():
+    global _pending_updates
+    with _updates_lock:
+        if _pending_updates is not None:
+            return
+        _pending_updates = []
+    threading.Thread(target=_rebuild_in_background, name='autocomplete-rebuild', daemon=True).start()
+
+
+def _rebuild():
+    global _index, _pending_updates
+    try:
+        index = PrefixIndex()
+        index.build(iter_index_items())
+    except Exception:
+        logger.exception('Rebuilding the autocomplete index failed')
+        with _updates_lock:
+            _pending_updates = None
+            # Retried after the next interval rather than on every search.
+            if _index is not None:
+                _index.built_at = time.monotonic()
+        return
+    with _updates_lock:
+        # Changes already read from the database are applied twice; score increments may count double
+        # until the next rebuild.
+        for callback in _pending_updates:
+            callback(index)
+        _index = index
+        _pending_updates = None
+
+
+def _rebuild_in_background():
+    try:
+        _rebuild()
+    finally:
+        connection.close()
+
+
+def _update_index(callback):
+    """
+    Applies an incremental change to the index, unless it has not been built yet, and to the index being rebuilt.
+    """
+    with _updates_lock:
+        if _index is not None:
+            callback(_index)
+        if _pending_updates is not None:
+            _pending_updates.append(callback)
+
+
+@receiver(post_save, sender=UserContent)
+def index_content(sender, instance, created, **kwargs):
+    # The callbacks may be replayed after a rebuild, so they get the values as they are now, not the instance.
+    pk, title = instance.pk, instance.title
+    _update_index(lambda index: index.upsert(CONTENT, pk, title))
+    if created:
+        author_id, category_id = instance.author.user_id, instance.category_id
+        _update_index(lambda index: (index.add_score(USER, author_id, 1), index.add_score(CATEGORY, category_id, 1)))
+
+
+@receiver(post_delete, sender=UserContent)
+def unindex_content(sender, instance, **kwargs):
+    pk = instance.pk
+    _update_index(lambda index: index.remove(CONTENT, pk))
+
+
+@receiver(content_soft_deleted, sender=UserContent)
+def unindex_deleted_content(sender, ids, **kwargs):
+    _update_index(lambda index: [index.remove(CONTENT, pk) for pk in ids])
+
+
+@receiver(content_batch_saved, sender=UserContent)
+def index_content_batch(sender, created, updated, **kwargs):
+    titles = [(instance.pk, instance.title) for instance in created + updated]
+    scores = [(instance.author.user_id, instance.category_id) for instance in created]
+
+    def apply(index):
+        for pk, title in titles:
+            index.upsert(CONTENT, pk, title)
+        for author_id, category_id in scores:
+            index.add_score(USER, author_id, 1)
+            index.add_score(CATEGORY, category_id, 1)
+
+    _update_index(apply)
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, **kwargs):
+    pk, username = instance.pk, instance.username
+    _update_index(lambda index: index.upsert(USER, pk, username))
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    pk = instance.pk
+    _update_index(lambda index: index.remove(USER, pk))
+
+
+@receiver(post_save, sender=Category)
+def index_category(sender, instance, **kwargs):
+    pk, name = instance.pk, instance.name
+    _update_index(lambda index: index.upsert(CATEGORY, pk, name))
+
+
+@receiver(post_delete, sender=Category)
+def unindex_category(sender, instance, **kwargs):
+    pk = instance.pk
+    _update_index(lambda index: index.remove(CATEGORY, pk))
+
+
+@receiver(post_save, sender=Interest)
+def index_interest(sender, instance, **kwargs):
+    pk, name = instance.pk, instance.name
+    _update_index(lambda index: index.upsert(INTEREST, pk, name))
+
+
+@receiver(post_delete, sender=Interest)
+def unindex_interest(sender, instance, **kwargs):
+    pk = instance.pk
+    _update_index(lambda index: index.remove(INTEREST, pk))
+
+
+@receiver(post_save, sender=Comment)
+def score_commented_content(sender, instance, created, **kwargs):
+    if created:
+        content_id = instance.commented_content_id
+        _update_index(lambda index: index.add_score(CONTENT, content_id, 1))
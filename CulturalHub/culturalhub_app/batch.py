@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.forms.models import model_to_dict
+
+from culturalhub_app.forms import ContentBatchForm
+from culturalhub_app.models import Category, Interest, UserContent, FeedEvent, content_batch_saved
+from culturalhub_app.revisions import record_revisions
+
+# Fields written with bulk_update; interests are stored in the through table separately.
+UPDATE_FIELDS = [name for name in ContentBatchForm.base_fields if name != 'interests']
+
+
+def _as_ids(values):
+    """
+    Returns the values which are valid primary keys; the others are reported by form validation.
+    """
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+def _form_errors(form):
+    return {field: [error['message'] for error in errors] for field, errors in form.errors.get_json_data().items()}
+
+
+def save_content_batch(author, items):
+    """
+    Validates a batch of content items with the rules of ContentEditForm and saves them in a single transaction.
+
+    Items with an 'id' update that content item of the author, only the fields given in the item are changed;
+    the others create new content. Categories, interests and the updated items are fetched with one query each,
+    and the rows are written with bulk_create/bulk_update, so the number of queries doesn't grow with the batch.
+    The updated items are locked while the batch is validated and written.
+    If any item is invalid nothing is saved. Updated titles and descriptions are kept in the revision history.
+
+    :param author: UserProfile creating the content, only their own content can be updated.
+    :param items: List of dicts with the form fields of the items.
+    :return: Tuple of (True if the batch was saved, list with a result dict for every item).
+    """
+    update_ids = _as_ids(item['id'] for item in items if isinstance(item, dict) and 'id' in item)
+    with transaction.atomic():
+        # Locked until the batch is written: the fields an item leaves out are copied from these rows,
+        # so a concurrent edit must not change them in between and be overwritten.
+        existing = (UserContent.objects.select_for_update().filter(author=author).prefetch_related('interests')
+                    .in_bulk(update_ids))
+        previous = {content.id: (content.title, content.description) for content in existing.values()}
+
+        category_ids = {content.category_id for content in existing.values()}
+        interest_ids = set()
+        for item in items:
+            if isinstance(item, dict):
+                category_ids |= _as_ids([item.get('category')])
+                interests = item.get('interests') or []
+                interest_ids |= _as_ids(interests if isinstance(interests, (list, tuple)) else [])
+        categories = Category.objects.in_bulk(category_ids)
+        interests = Interest.objects.in_bulk(interest_ids)
+        for content in existing.values():
+            interests.update((interest.id, interest) for interest in content.interests.all())
+
+        results, created, updated, saved, seen = [], [], [], [], set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({'index': index, 'errors': {'__all__': ['Item must be an object.']}})
+                continue
+            if 'id' in item:
+                content = existing.get(next(iter(_as_ids([item['id']])), None))
+                if content is None or content.id in seen:
+                    results.append({'index': index, 'errors': {
+                        'id': ['Content does not exist, is not yours or appears in the batch more than once.']
+                    }})
+                    continue
+                seen.add(content.id)
+                data = model_to_dict(content, fields=ContentBatchForm.base_fields)
+                data['interests'] = [interest.id for interest in data['interests']]
+                data.update(item)
+            else:
+                content = UserContent(author=author)
+                data = item
+
+            form = ContentBatchForm(data, instance=content, categories=categories, interests=interests)
+            if not form.is_valid():
+                results.append({'index': index, 'errors': _form_errors(form)})
+                continue
+            result = {'index': index, 'status': 'updated' if content.pk else 'created'}
+            (updated if content.pk else created).append((form.save(commit=False), form.cleaned_data['interests']))
+            results.append(result)
+            saved.append((result, content))
+
+        if any('errors' in result for result in results):
+            return False, results
+
+        through = UserContent.interests.through
+        UserContent.objects.bulk_create([content for content, _ in created])
+        UserContent.objects.bulk_update([content for content, _ in updated], UPDATE_FIELDS)
+        record_revisions([(content, *previous[content.id]) for content, _ in updated], author)
+        through.objects.filter(usercontent_id__in=[content.id for content, _ in updated]).delete()
+        through.objects.bulk_create([
+            through(usercontent_id=content.id, interest_id=interest.id)
+            for content, content_interests in created + updated for interest in content_interests
+        ])
+        FeedEvent.objects.bulk_create([FeedEvent(content=content) for content, _ in created])
+        transaction.on_commit(lambda: content_batch_saved.send(
+            sender=UserContent, created=[content for content, _ in created], updated=[content for content, _ in updated]
+        ))
+
+    for result, content in saved:
+        result['id'] = content.id
+    return True, results
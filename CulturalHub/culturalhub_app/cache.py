@@ -0,0 +1,310 @@
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+# Keys of the shared tier holding the number of the latest invalidation message and the messages themselves.
+INVALIDATION_SEQ_KEY = 'two-tier:invalidation-seq'
+INVALIDATION_MESSAGE_KEY = 'two-tier:invalidation:%d'
+
+# Local tiers of this process, keyed by the alias of their shared tier. Like LocMemCache, they are module-level,
+# so the cache objects Django creates for each thread share them.
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+_missing = object()
+
+
+class LocalTier:
+    """
+    In-process LRU of pickled values, bounded by the number of entries and their total size.
+    Entries expire after their own timeout or after the local timeout, whichever comes first.
+    """
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (expires at, pickled value)
+        self.size = 0
+        self.lock = threading.Lock()
+        self.poll_lock = threading.Lock()
+        self.stats = Counter()
+        # Number of the latest invalidation message applied, None until the first poll.
+        self.seq = None
+        self.polled_at = 0.0
+        # Messages sent by this process, which don't need to be applied to it.
+        self.own_messages = set()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.stats['local_misses'] += 1
+                return _missing
+            self.entries.move_to_end(key)
+            self.stats['local_hits'] += 1
+        return pickle.loads(entry[1])
+
+    def set(self, key, pickled, timeout):
+        if len(pickled) > self.max_bytes:
+            self.delete(key)
+            return
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + timeout, pickled)
+            self.size += len(pickled)
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+                self.stats['local_evictions'] += 1
+
+    def delete(self, key):
+        with self.lock:
+            return self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.own_messages.clear()
+
+    def count(self, name, number=1):
+        with self.lock:
+            self.stats[name] += number
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= len(entry[1])
+        return True
+
+
+def get_local_tier(name, max_entries, max_bytes):
+    with _local_tiers_lock:
+        if name not in _local_tiers:
+            _local_tiers[name] = LocalTier(max_entries, max_bytes)
+        return _local_tiers[name]
+
+
+class TwoTierCache(BaseCache):
+    """
+    Cache keeping recently used values in the memory of each process in front of a shared cache.
+
+    LOCATION is the alias of the shared cache in CACHES. OPTIONS:
+    MAX_ENTRIES and LOCAL_MAX_BYTES bound the local tier, LOCAL_TIMEOUT is the number of seconds
+    a value is kept locally at most. Every write is announced to the other processes with a numbered
+    invalidation message in the shared tier; each process reads the new messages at most every
+    INVALIDATION_POLL_SECONDS and drops its local copies of the written keys.
+    Messages are kept for INVALIDATION_MESSAGE_TIMEOUT seconds; a process which missed some of them
+    drops its whole local tier, as it does when the shared tier evicted the message counter.
+
+    Messages are numbered with incr() of the shared tier, so it has to be atomic: the shared cache must be
+    a backend implementing incr itself (Redis, Memcached or, within one process, local memory) rather than
+    with the get and set of BaseCache, which would let two processes overwrite each other's message.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = location
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self._poll_seconds = options.get('INVALIDATION_POLL_SECONDS', 0.5)
+        self._message_timeout = options.get('INVALIDATION_MESSAGE_TIMEOUT', 60)
+        self._local = get_local_tier(location, self._max_entries, options.get('LOCAL_MAX_BYTES', 16 * 1024 * 1024))
+
+    @property
+    def shared(self):
+        shared = caches[self._shared_alias]
+        if type(shared).incr is BaseCache.incr:
+            raise ImproperlyConfigured(
+                f"The shared cache '{self._shared_alias}' of TwoTierCache has no atomic incr(), "
+                f"use e.g. Redis or Memcached instead of {type(shared).__name__}."
+            )
+        return shared
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _store_locally(self, local_key, value, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        local_timeout = self._local_timeout if timeout is None else min(self._local_timeout, timeout - time.time())
+        if local_timeout > 0:
+            self._local.set(local_key, pickle.dumps(value, self.pickle_protocol), local_timeout)
+        else:
+            self._local.delete(local_key)
+
+    def _publish(self, local_keys):
+        """
+        Drops the keys from the local tiers of the other processes.
+        """
+        try:
+            seq = self.shared.incr(INVALIDATION_SEQ_KEY)
+        except ValueError:
+            self.shared.add(INVALIDATION_SEQ_KEY, 0, timeout=None)
+            seq = self.shared.incr(INVALIDATION_SEQ_KEY)
+        self.shared.set(INVALIDATION_MESSAGE_KEY % seq, list(local_keys), timeout=self._message_timeout)
+        with self._local.lock:
+            self._local.own_messages.add(seq)
+
+    def _poll(self):
+        """
+        Applies the invalidation messages sent by other processes since the last poll.
+        Only one thread of the process polls at a time, the others keep serving their reads meanwhile.
+        """
+        local = self._local
+        if time.monotonic() - local.polled_at < self._poll_seconds or not local.poll_lock.acquire(blocking=False):
+            return
+        try:
+            local.polled_at = time.monotonic()
+            seq = self.shared.get(INVALIDATION_SEQ_KEY, 0)
+            last, local.seq = local.seq, seq
+            if last is None or seq == last:
+                return
+            if seq < last:
+                # The shared tier was cleared, or lost the counter.
+                self._drop_local()
+                return
+
+            with local.lock:
+                numbers = [number for number in range(last + 1, seq + 1) if number not in local.own_messages]
+                local.own_messages.difference_update(range(last + 1, seq + 1))
+            messages = self.shared.get_many([INVALIDATION_MESSAGE_KEY % number for number in numbers])
+            if len(messages) < len(numbers):
+                # Some messages expired (or are not written yet), so any local value may be stale.
+                self._drop_local()
+                return
+            for local_keys in messages.values():
+                dropped = sum(local.delete(local_key) for local_key in local_keys)
+                local.count('invalidations', dropped)
+        finally:
+            local.poll_lock.release()
+
+    def _drop_local(self):
+        self._local.clear()
+        self._local.count('local_clears')
+
+    def _get_shared(self, key, version):
+        value = self.shared.get(key, _missing, version=version)
+        self._local.count('shared_misses' if value is _missing else 'shared_hits')
+        return value
+
+    def get(self, key, default=None, version=None):
+        local_key = self._local_key(key, version)
+        self._poll()
+        value = self._local.get(local_key)
+        if value is _missing:
+            value = self._get_shared(key, version)
+            if value is _missing:
+                return default
+            # The remaining timeout of the shared entry isn't known, the local timeout bounds the staleness.
+            self._store_locally(local_key, value, None)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._poll()
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._local.get(self._local_key(key, version))
+            if value is _missing:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            self._local.count('shared_hits', len(shared))
+            self._local.count('shared_misses', len(missing) - len(shared))
+            for key, value in shared.items():
+                self._store_locally(self._local_key(key, version), value, None)
+            found.update(shared)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _missing, version=version) is not _missing
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        self.shared.set(key, value, timeout=self._shared_timeout(timeout), version=version)
+        self._store_locally(local_key, value, timeout)
+        self._publish([local_key])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout=self._shared_timeout(timeout), version=version)
+        local_keys = []
+        for key, value in data.items():
+            local_key = self._local_key(key, version)
+            local_keys.append(local_key)
+            if key in failed:
+                self._local.delete(local_key)
+            else:
+                self._store_locally(local_key, value, timeout)
+        if local_keys:
+            self._publish(local_keys)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self._local_key(key, version)
+        if not self.shared.add(key, value, timeout=self._shared_timeout(timeout), version=version):
+            return False
+        self._store_locally(local_key, value, timeout)
+        self._publish([local_key])
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=self._shared_timeout(timeout), version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # Incremented in the shared tier, whose incr is atomic, never from a possibly stale local copy.
+        local_key = self._local_key(key, version)
+        value = self.shared.incr(key, delta, version=version)
+        self._local.delete(local_key)
+        self._publish([local_key])
+        return value
+
+    def delete(self, key, version=None):
+        local_key = self._local_key(key, version)
+        deleted = self.shared.delete(key, version=version)
+        self._local.delete(local_key)
+        self._publish([local_key])
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        local_keys = [self._local_key(key, version) for key in keys]
+        if not local_keys:
+            return
+        self.shared.delete_many(keys, version=version)
+        for local_key in local_keys:
+            self._local.delete(local_key)
+        self._publish(local_keys)
+
+    def clear(self):
+        # Also removes the invalidation counter, which makes the other processes drop their local tiers.
+        self.shared.clear()
+        self._drop_local()
+
+    def _shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get_stats(self):
+        """
+        Returns the hits and misses of the local and the shared tier in this process, the local entries evicted
+        to stay within the bounds, those dropped because other processes wrote their keys and the number of times
+        the whole local tier was dropped.
+        """
+        local = self._local
+        with local.lock:
+            stats = {name: local.stats[name] for name in ('local_hits', 'local_misses', 'shared_hits', 'shared_misses',
+                                                          'local_evictions', 'invalidations', 'local_clears')}
+            stats.update(local_entries=len(local.entries), local_bytes=local.size)
+        return stats
+
+    def reset_stats(self):
+        with self._local.lock:
+            self._local.stats.clear()
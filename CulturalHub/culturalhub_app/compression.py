@@ -0,0 +1,71 @@
+import gzip
+import secrets
+
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# File extensions of static files worth compressing, other formats (images, fonts) are compressed already.
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.html', '.txt', '.json', '.xml', '.svg', '.ico')
+
+# Content types of dynamic responses worth compressing.
+COMPRESSIBLE_CONTENT_TYPES = ('text/html', 'text/plain', 'text/css', 'text/javascript',
+                              'application/javascript', 'application/json', 'image/svg+xml')
+
+# Supported encodings in order of preference, with the suffix of their precompressed files.
+ENCODINGS = {'br': '.br', 'gzip': '.gz'} if brotli else {'gzip': '.gz'}
+
+
+def accepted_encodings(header):
+    """
+    Returns the supported encodings accepted by a client, in the server's order of preference.
+
+    :param header: Value of the Accept-Encoding request header.
+    """
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    if '*' in accepted:
+        return list(ENCODINGS)
+    return [encoding for encoding in ENCODINGS if encoding in accepted]
+
+
+def brotli_padding(length):
+    """
+    Returns a brotli metadata meta-block skipping the given number (1 to 256) of bytes. Decoders ignore it,
+    so it can be inserted at a byte aligned boundary between meta-blocks to change the length of a stream.
+    """
+    header = 0b0110 | 1 << 4 | (length - 1) << 6  # ISLAST 0, MNIBBLES 0, one MSKIPLEN byte.
+    return header.to_bytes(2, 'little') + b'\0' * length
+
+
+def compress(data, encoding, best=False, max_random_bytes=None):
+    """
+    Compresses bytes with the given encoding ('br' or 'gzip').
+
+    :param best: Use the slowest, best compression. Meant for files compressed once at build time,
+                 responses compressed on every request use a faster level.
+    :param max_random_bytes: Pad the output with up to this many random bytes, which makes BREACH attacks
+                             on secrets in dynamic responses impractical (like Django's GZipMiddleware does).
+    """
+    if encoding == 'br':
+        if not max_random_bytes:
+            return brotli.compress(data, quality=11 if best else 5)
+        compressor = brotli.Compressor(quality=11 if best else 5)
+        # A flush ends the output at a meta-block boundary, where the padding can go.
+        compressed = compressor.process(data) + compressor.flush()
+        return compressed + brotli_padding(secrets.randbelow(max_random_bytes) + 1) + compressor.finish()
+    if max_random_bytes:
+        return compress_string(data, max_random_bytes=max_random_bytes)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
@@ -0,0 +1,107 @@
+import random
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from culturalhub_app import identity_map
+
+# Alias used for reads of the current request, or None when reads must go to the primary.
+_read_alias = ContextVar('read_alias', default=None)
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+def get_replicas():
+    """
+    Returns the list of replica aliases configured in settings.DATABASE_REPLICAS.
+    """
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def choose_replica():
+    """
+    Picks one of the configured replicas at random, or None if no replica is configured.
+    """
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    return random.choice(replicas)
+
+
+def use_replica(alias):
+    """
+    Routes the reads of the current request to the given replica alias (None means the primary).
+    Returns a token which can be passed to reset_read_alias() to restore the previous state.
+    """
+    return _read_alias.set(alias)
+
+
+def reset_read_alias(token):
+    _read_alias.reset(token)
+
+
+def pin_to_primary():
+    """
+    Sends all remaining reads of the current request to the primary database. The objects the request
+    has loaded so far are dropped from its identity map, as they may predate the write causing the pin.
+    """
+    _read_alias.set(None)
+    identity_map.clear_identity_map()
+
+
+def record_request(alias):
+    """
+    Counts a request served from the given database alias.
+    """
+    with _stats_lock:
+        _stats[alias or DEFAULT_DB_ALIAS] += 1
+
+
+def get_routing_stats():
+    """
+    Returns how many requests of this worker were served by the primary and by each replica.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_routing_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router sending reads of GET views to a replica and everything else to the primary.
+    The replica for a request is selected by ReplicaRoutingMiddleware; outside of a request
+    (management commands, shell, background jobs) all queries go to the primary.
+    """
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        """
+        Writes always go to the primary. Once a request writes, its later reads are pinned
+        to the primary as well, so the user sees their own change.
+        """
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        The primary and its replicas hold the same data, so relations between them are allowed.
+        """
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """
+        Replicas receive their schema through replication, migrations only run on the primary.
+        """
+        return db not in get_replicas()
@@ -0,0 +1,234 @@
+import random
+import re
+import struct
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from culturalhub_app.models import UserContent, ContentSignature, ContentBucket, content_batch_saved
+
+# Signatures consist of BANDS bands of ROWS MinHash values. Two items land in a common bucket with the probability
+# 1 - (1 - s ** ROWS) ** BANDS for a similarity s, i.e. almost surely from 0.8 on and rarely below 0.4.
+# Changing these requires rebuilding the stored signatures with cluster_duplicates --reindex.
+BANDS = 20
+ROWS = 5
+PERMUTATIONS = BANDS * ROWS
+
+# Words of a text; the text is represented by the set of its SHINGLE_WORDS word sequences.
+WORD = re.compile(r'\w+')
+SHINGLE_WORDS = 3
+
+# Members of a bucket are compared with at most this many preceding members when clustering,
+# so buckets of heavily repeated texts don't take quadratic time.
+CLUSTER_WINDOW = 100
+
+_PRIME = (1 << 61) - 1
+_random = random.Random(20240601)
+_COEFFICIENTS = [(_random.randrange(1, _PRIME), _random.randrange(_PRIME)) for _ in range(PERMUTATIONS)]
+
+
+def shingles(text):
+    words = WORD.findall(text.lower())
+    if len(words) <= SHINGLE_WORDS:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash(text):
+    """
+    Returns the MinHash signature of a text as a tuple of PERMUTATIONS integers, or None for a text without words.
+    The share of equal positions in two signatures estimates the Jaccard similarity of the shingles of the texts.
+    """
+    hashes = [int.from_bytes(blake2b(shingle.encode(), digest_size=8).digest(), 'little') for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _COEFFICIENTS)
+
+
+def content_signature(content):
+    """
+    Returns the signature of the title and description of a content item. It is remembered on the instance,
+    so checking a new item for duplicates and indexing it after saving computes it once.
+    """
+    text = f'{content.title}\n{content.description}'
+    cached = getattr(content, '_minhash', None)
+    if cached is None or cached[0] != text:
+        cached = content._minhash = (text, minhash(text))
+    return cached[1]
+
+
+def pack(signature):
+    return struct.pack(f'<{PERMUTATIONS}Q', *signature)
+
+
+def unpack(data):
+    return struct.unpack(f'<{PERMUTATIONS}Q', bytes(data))
+
+
+def bucket_keys(signature):
+    """
+    Returns a bucket key per band of the signature, hashed into the range of a signed 64 bit column.
+    """
+    return [
+        int.from_bytes(blake2b(struct.pack(f'<H{ROWS}Q', band, *signature[band * ROWS:(band + 1) * ROWS]),
+                               digest_size=8).digest(), 'little', signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature, other):
+    return sum(a == b for a, b in zip(signature, other)) / PERMUTATIONS
+
+
+def find_duplicates(content):
+    """
+    Returns the visible content items similar to the given (possibly unsaved) one by at least
+    DUPLICATE_SIMILARITY_THRESHOLD, as (content, similarity) pairs, most similar first.
+    Only the items sharing a bucket with it are compared, found with one lookup of the bucket index.
+    """
+    signature = content_signature(content)
+    if signature is None:
+        return []
+    candidates = ContentSignature.objects.filter(
+        content__in=ContentBucket.objects.filter(key__in=bucket_keys(signature)).values('content'),
+        content__deleted_at__isnull=True,
+    )
+    if content.pk is not None:
+        candidates = candidates.exclude(content=content.pk)
+    candidates = candidates[:settings.DUPLICATE_MAX_CANDIDATES].values_list('content', 'signature')
+
+    similar = {}
+    for content_id, other in candidates:
+        score = similarity(signature, unpack(other))
+        if score >= settings.DUPLICATE_SIMILARITY_THRESHOLD:
+            similar[content_id] = score
+    duplicates = UserContent.objects.select_related('category').in_bulk(similar)
+    return sorted(((duplicates[pk], score) for pk, score in similar.items() if pk in duplicates),
+                  key=lambda pair: (-pair[1], pair[0].id))
+
+
+def index_contents(contents):
+    """
+    Stores the signatures and bucket keys of the content items, replacing their previous ones.
+    """
+    signatures, buckets = [], []
+    for content in contents:
+        signature = content_signature(content)
+        if signature is not None:
+            signatures.append(ContentSignature(content_id=content.pk, signature=pack(signature)))
+            buckets.extend(ContentBucket(content_id=content.pk, key=key) for key in bucket_keys(signature))
+    ids = [content.pk for content in contents]
+    with transaction.atomic():
+        ContentBucket.objects.filter(content__in=ids).delete()
+        ContentSignature.objects.filter(content__in=ids).exclude(
+            content__in=[signature.content_id for signature in signatures]
+        ).delete()
+        ContentSignature.objects.bulk_create(signatures, update_conflicts=True, unique_fields=['content'],
+                                             update_fields=['signature'])
+        ContentBucket.objects.bulk_create(buckets)
+
+
+def index_missing(batch_size, reindex=False):
+    """
+    Indexes the content items without a signature (all of them with reindex), batch_size at a time.
+
+    :return: Number of indexed content items.
+    """
+    contents = UserContent.all_objects.only('id', 'title', 'description').order_by('id')
+    if not reindex:
+        contents = contents.filter(signature__isnull=True)
+    indexed, last_id = 0, 0
+    while True:
+        batch = list(contents.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return indexed
+        index_contents(batch)
+        indexed += len(batch)
+        last_id = batch[-1].id
+
+
+def _find(parents, pk):
+    while parents.setdefault(pk, pk) != pk:
+        parents[pk] = parents[parents[pk]]
+        pk = parents[pk]
+    return pk
+
+
+def _load_signatures(ids, batch_size):
+    ids = sorted(ids)
+    signatures = {}
+    for start in range(0, len(ids), batch_size):
+        signatures.update((content_id, unpack(signature)) for content_id, signature in ContentSignature.objects.filter(
+            content__in=ids[start:start + batch_size]).values_list('content', 'signature'))
+    return signatures
+
+
+def cluster_duplicates(batch_size):
+    """
+    Groups the visible content items into clusters of near-duplicates: items sharing a bucket are compared
+    and joined into one cluster when their similarity reaches DUPLICATE_SIMILARITY_THRESHOLD.
+    The bucket index is streamed sorted by key and only buckets with several members are kept, so memory
+    is needed for the items sharing a bucket with another one, not for all of them.
+
+    :return: List of clusters with at least two items, each a sorted list of content ids, oldest cluster first.
+    """
+    groups, members = [], []
+    buckets = (ContentBucket.objects.filter(content__deleted_at__isnull=True).order_by('key', 'content')
+               .values_list('key', 'content'))
+    current = None
+    for key, content_id in buckets.iterator(chunk_size=batch_size):
+        if key != current:
+            if len(members) > 1:
+                groups.append(members)
+            current, members = key, []
+        members.append(content_id)
+    if len(members) > 1:
+        groups.append(members)
+
+    signatures = _load_signatures({content_id for group in groups for content_id in group}, batch_size)
+
+    parents = {}
+    threshold = settings.DUPLICATE_SIMILARITY_THRESHOLD
+    for group in groups:
+        for i, content_id in enumerate(group):
+            if content_id not in signatures:
+                # Deleted since the buckets were read.
+                continue
+            for other in group[max(0, i - CLUSTER_WINDOW):i]:
+                if other in signatures and _find(parents, content_id) != _find(parents, other) \
+                        and similarity(signatures[content_id], signatures[other]) >= threshold:
+                    parents[_find(parents, content_id)] = _find(parents, other)
+
+    clusters = {}
+    for content_id in parents:
+        clusters.setdefault(_find(parents, content_id), []).append(content_id)
+    return sorted((sorted(cluster) for cluster in clusters.values() if len(cluster) > 1), key=lambda cluster: cluster[0])
+
+
+def duplicates_of_oldest(clusters, batch_size):
+    """
+    Returns the ids of the items of the clusters whose similarity to the oldest item of their cluster reaches
+    DUPLICATE_SIMILARITY_THRESHOLD. Clusters are transitive, so the other items are only linked to the oldest one
+    through a chain of similar items and may differ from it considerably.
+    """
+    signatures = _load_signatures({content_id for cluster in clusters for content_id in cluster}, batch_size)
+    threshold = settings.DUPLICATE_SIMILARITY_THRESHOLD
+    return [
+        content_id for oldest, *others in clusters if oldest in signatures for content_id in others
+        if content_id in signatures and similarity(signatures[oldest], signatures[content_id]) >= threshold
+    ]
+
+
+@receiver(post_save, sender=UserContent)
+def index_saved_content(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not {'title', 'description'} & set(update_fields)):
+        return
+    index_contents([instance])
+
+
+@receiver(content_batch_saved, sender=UserContent)
+def index_content_batch(sender, created, updated, **kwargs):
+    index_contents(created + updated)
@@ -0,0 +1,174 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from culturalhub_app.models import UserProfile, UserContent, Interest, Follow, FeedEvent, FeedItem
+
+
+def is_popular(profile):
+    """
+    Checks if an author has too many followers to copy their content into every follower's feed.
+    Content of popular authors is merged into the feeds of their followers when the feed is read instead.
+    """
+    return profile.follower_count > settings.FEED_FANOUT_LIMIT
+
+
+def popular_interests():
+    """
+    Interests of more than FEED_FANOUT_LIMIT users. Content tagged with them is merged into the feeds of these users
+    when the feed is read instead of being copied into each of them.
+    """
+    return Interest.objects.filter(profile_count__gt=settings.FEED_FANOUT_LIMIT)
+
+
+def recount_interested_profiles():
+    """
+    Recomputes Interest.profile_count from the interests of the profiles, e.g. for interests which existed before
+    it was maintained, or after interests were changed without signals (bulk deletes, raw SQL).
+
+    :return: Number of interests whose count was corrected.
+    """
+    profiles = (UserProfile.interests.through.objects.filter(interest=OuterRef('pk')).values('interest')
+                .annotate(count=Count('*')).values('count'))
+    return (Interest.objects.annotate(actual=Coalesce(Subquery(profiles), 0)).exclude(profile_count=F('actual'))
+            .update(profile_count=Coalesce(Subquery(profiles), 0)))
+
+
+def get_audience(event):
+    """
+    Returns a dict mapping the ids of the profiles which should see the event in their feed to the reason why.
+    """
+    audience = {}
+    content = event.content
+    if event.comment is None:
+        if not is_popular(content.author):
+            for follower_id in Follow.objects.filter(author=content.author).values_list('follower_id', flat=True):
+                audience[follower_id] = FeedItem.FOLLOWED_AUTHOR
+        interests = content.interests.all()
+        popular = list(interests.filter(id__in=popular_interests()).values_list('id', flat=True))
+        interested = UserProfile.objects.filter(interests__in=interests.exclude(id__in=popular))
+        if popular:
+            # These users get the content merged into their feed through the popular interest.
+            interested = interested.exclude(interests__in=popular)
+        for profile_id in interested.values_list('id', flat=True).distinct():
+            audience.setdefault(profile_id, FeedItem.INTEREST)
+        audience.pop(content.author_id, None)
+    else:
+        commenter = event.comment.user
+        if not is_popular(commenter):
+            for follower_id in Follow.objects.filter(author=commenter).values_list('follower_id', flat=True):
+                audience[follower_id] = FeedItem.COMMENT
+        audience[content.author_id] = FeedItem.COMMENT
+        audience.pop(commenter.id, None)
+    return audience
+
+
+def trim_feeds(owner_ids):
+    """
+    Deletes the items exceeding FEED_MAX_ITEMS from the feeds of the given profiles, oldest first.
+    Feeds over the cap are found with one aggregate query and trimmed with a single DELETE ranking their items.
+    """
+    over_cap = FeedItem.objects.filter(owner__in=owner_ids).values('owner').annotate(
+        items=Count('id')
+    ).filter(items__gt=settings.FEED_MAX_ITEMS).values('owner')
+    ranked = FeedItem.objects.filter(owner__in=over_cap).annotate(
+        position=Window(RowNumber(), partition_by=F('owner'), order_by=(F('created_at').desc(), F('id').desc()))
+    )
+    FeedItem.objects.filter(id__in=ranked.filter(position__gt=settings.FEED_MAX_ITEMS).values('id')).delete()
+
+
+def process_feed_events(batch_size=None):
+    """
+    Fans out a batch of queued feed events to the feeds of their audience.
+    Events are locked with SKIP LOCKED, so several processes can work through the queue at the same time.
+
+    :return: Number of processed events.
+    """
+    batch_size = batch_size or settings.FEED_BATCH_SIZE
+    with transaction.atomic():
+        events = list(
+            FeedEvent.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('content__author', 'comment__user').order_by('id')[:batch_size]
+        )
+        owners = set()
+        for event in events:
+            created_at = event.comment.created_at if event.comment else event.content.created_at or event.created_at
+            items = (
+                FeedItem(owner_id=owner_id, content_id=event.content_id, comment_id=event.comment_id,
+                         reason=reason, created_at=created_at)
+                for owner_id, reason in get_audience(event).items()
+            )
+            while chunk := list(islice(items, settings.FEED_BATCH_SIZE)):
+                FeedItem.objects.bulk_create(chunk)
+                owners.update(item.owner_id for item in chunk)
+
+        FeedEvent.objects.filter(id__in=[event.id for event in events]).delete()
+        trim_feeds(owners)
+    return len(events)
+
+
+def feed_cursor(item):
+    """
+    Returns the position of a feed item in the order of get_feed, to be passed as its before argument
+    for the next page: the time of the item, whether it was merged in when reading and its id
+    (the content id for merged items, which are not stored).
+    """
+    pulled = item.pk is None
+    return item.created_at, pulled, item.content_id if pulled else item.pk
+
+
+def _before(cursor, pulled, id_field):
+    """
+    Returns the condition selecting the stored (pulled=False) or merged items following the cursor.
+    At equal times merged items come first, then each kind by decreasing id.
+    """
+    created_at, cursor_pulled, pk = cursor
+    if pulled and not cursor_pulled:
+        return Q(created_at__lt=created_at)
+    if cursor_pulled and not pulled:
+        return Q(created_at__lte=created_at)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': pk})
+
+
+def get_feed(profile, before=None, limit=None):
+    """
+    Returns a page of the feed of a profile, newest first.
+    The stored feed is read with a single range scan of the (owner, created_at, id) index; recent content of
+    followed popular authors and content tagged with popular interests of the profile, which is not fanned out,
+    is merged into it.
+
+    :param before: Only items following this cursor are returned (feed_cursor of the last item of the previous page).
+    """
+    limit = limit or settings.FEED_PAGE_SIZE
+    items = FeedItem.objects.filter(owner=profile, content__deleted_at__isnull=True).select_related(
+        'content', 'comment__user__user'
+    )
+    if before is not None:
+        items = items.filter(_before(before, False, 'id'))
+    items = list(items.order_by('-created_at', '-id')[:limit])
+
+    followed = Follow.objects.filter(follower=profile)
+    popular_authors = followed.filter(author__follower_count__gt=settings.FEED_FANOUT_LIMIT).values('author_id')
+    interests = profile.interests.filter(id__in=popular_interests()).values('id')
+    # Content of other followed authors is fanned out, so the followers already have it stored.
+    contents = UserContent.objects.filter(
+        Q(author__in=popular_authors)
+        | Q(interests__in=interests) & ~Q(author__in=followed.values('author_id')) & ~Q(author=profile),
+        created_at__isnull=False,
+    ).distinct()
+    if before is not None:
+        contents = contents.filter(_before(before, True, 'id'))
+    following = set(popular_authors.values_list('author_id', flat=True))
+    pulled = [
+        FeedItem(owner=profile, content=content, created_at=content.created_at,
+                 reason=FeedItem.FOLLOWED_AUTHOR if content.author_id in following else FeedItem.INTEREST)
+        for content in contents.order_by('-created_at', '-id')[:limit]
+    ]
+    if not pulled:
+        return items
+    return list(islice(merge(pulled, items, key=lambda item: (item.created_at, item.pk is None), reverse=True),
+                       limit))
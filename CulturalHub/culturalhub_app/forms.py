@@ -2,7 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from datetime import date
-from .models import UserProfile, UserContent, Comment
+from .models import UserProfile, UserContent, Comment, RatingVote, Category, Interest
 
 
 class RegistrationForm(UserCreationForm):
@@ -51,7 +51,7 @@ class RegistrationForm(UserCreationForm):
 class UserProfileForm(forms.ModelForm):
     class Meta:
         model = UserProfile
-        fields = ['country', 'birth_year', 'about', 'interests']
+        fields = ['country', 'birth_year', 'about', 'interests', 'avatar']
 
     def __init__(self, *args, **kwargs):
         """
@@ -69,11 +69,80 @@ class ContentEditForm(forms.ModelForm):
         exclude = ('author',)
 
 
+class PrefetchedModelChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField validating values against objects fetched beforehand instead of querying the database.
+    """
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[int(value)]
+        except (KeyError, ValueError, TypeError):
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class PrefetchedModelMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    ModelMultipleChoiceField validating values against objects fetched beforehand instead of querying the database.
+    """
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = objects
+
+    def clean(self, value):
+        if not value:
+            if self.required:
+                raise forms.ValidationError(self.error_messages['required'], code='required')
+            return []
+        if not isinstance(value, (list, tuple)):
+            raise forms.ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+        try:
+            return [self.objects[int(pk)] for pk in value]
+        except (KeyError, ValueError, TypeError) as error:
+            raise forms.ValidationError(self.error_messages['invalid_pk_value'], code='invalid_pk_value',
+                                        params={'pk': error.args[0] if error.args else value})
+
+
+class ContentBatchForm(ContentEditForm):
+    """
+    ContentEditForm used for one item of a batch.
+    Categories and interests of the whole batch are fetched once and passed in, so validating an item runs no queries.
+    """
+    class Meta(ContentEditForm.Meta):
+        exclude = ('author', 'image')
+
+    def __init__(self, *args, categories, interests, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'] = PrefetchedModelChoiceField(categories, queryset=Category.objects.none(),
+                                                             label=self.fields['category'].label)
+        self.fields['interests'] = PrefetchedModelMultipleChoiceField(interests, queryset=Interest.objects.none(),
+                                                                      label=self.fields['interests'].label)
+
+    def _get_validation_exclusions(self):
+        """
+        The category has been validated against the prefetched categories already,
+        model validation would check its existence again with a query per item.
+        """
+        exclusions = super()._get_validation_exclusions()
+        exclusions.add('category')
+        return exclusions
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ['text']
 
 
-
-
+class RatingVoteForm(forms.ModelForm):
+    class Meta:
+        model = RatingVote
+        fields = ['value']
+        widgets = {
+            'value': forms.Select(choices=[(value, value) for value in range(1, 6)]),
+        }
@@ -0,0 +1,145 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models, router
+from django.db.models.fields.related_descriptors import (ForwardManyToOneDescriptor, ForwardOneToOneDescriptor,
+                                                         ReverseOneToOneDescriptor)
+
+# Identity map of the current request, or None outside of a request scope.
+_current = ContextVar('identity_map', default=None)
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+
+class IdentityMap:
+    """
+    Objects loaded during one request, keyed by model, database alias and primary key (and by the value of each
+    one-to-one field, so reverse one-to-one lookups such as user.userprofile can be answered too).
+    Every hit is a query which was not sent to the database.
+    """
+    def __init__(self):
+        self.objects = {}
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, obj):
+        model = obj._meta.concrete_model
+        self.objects.setdefault((model, obj._state.db, 'pk', obj.pk), obj)
+        for field in obj._meta.concrete_fields:
+            if field.one_to_one and not field.primary_key:
+                self.objects.setdefault((model, obj._state.db, field.attname, getattr(obj, field.attname)), obj)
+        return obj
+
+    def get(self, model, using, value, field='pk'):
+        obj = self.objects.get((model._meta.concrete_model, using, field, value))
+        if obj is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return obj
+
+    def clear(self):
+        self.objects.clear()
+
+
+def get_identity_map():
+    return _current.get()
+
+
+def clear_identity_map():
+    """
+    Forgets the objects loaded so far in the current request, e.g. because it has written to the database
+    and they may be outdated.
+    """
+    identity_map = _current.get()
+    if identity_map is not None:
+        identity_map.clear()
+
+
+@contextmanager
+def identity_map_scope():
+    """
+    Deduplicates the lookups of related objects made within the block.
+    """
+    identity_map = IdentityMap()
+    token = _current.set(identity_map)
+    try:
+        yield identity_map
+    finally:
+        _current.reset(token)
+        record_scope(identity_map)
+
+
+def record_scope(identity_map):
+    with _stats_lock:
+        _stats['scopes'] += 1
+        _stats['hits'] += identity_map.hits
+        _stats['misses'] += identity_map.misses
+
+
+def get_identity_map_stats():
+    """
+    Returns the number of request scopes of this worker, the lookups answered by their identity maps
+    (i.e. saved queries) and the lookups which had to query the database.
+    """
+    with _stats_lock:
+        return {'scopes': _stats['scopes'], 'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_identity_map_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class IdentityMappedForwardMixin:
+    def get_object(self, instance):
+        identity_map = _current.get()
+        if identity_map is None or not self.field.target_field.primary_key:
+            return super().get_object(instance)
+        model = self.field.remote_field.model
+        obj = identity_map.get(model, router.db_for_read(model, instance=instance),
+                               getattr(instance, self.field.attname))
+        if obj is None:
+            obj = identity_map.add(super().get_object(instance))
+        return obj
+
+
+class IdentityMappedForwardManyToOneDescriptor(IdentityMappedForwardMixin, ForwardManyToOneDescriptor):
+    pass
+
+
+class IdentityMappedForwardOneToOneDescriptor(IdentityMappedForwardMixin, ForwardOneToOneDescriptor):
+    pass
+
+
+class IdentityMappedReverseOneToOneDescriptor(ReverseOneToOneDescriptor):
+    def __get__(self, instance, cls=None):
+        identity_map = _current.get()
+        if instance is None or identity_map is None or self.related.is_cached(instance):
+            return super().__get__(instance, cls)
+        model = self.related.related_model
+        obj = identity_map.get(model, router.db_for_read(model, instance=instance), instance.pk,
+                               field=self.related.field.attname)
+        if obj is None:
+            return identity_map.add(super().__get__(instance, cls))
+        self.related.set_cached_value(instance, obj)
+        return obj
+
+
+class IdentityMappedForeignKey(models.ForeignKey):
+    """
+    ForeignKey whose related object is looked up in the identity map of the current request first.
+    """
+    forward_related_accessor_class = IdentityMappedForwardManyToOneDescriptor
+
+
+class IdentityMappedOneToOneField(models.OneToOneField):
+    """
+    OneToOneField whose related objects, in both directions, are looked up in the identity map
+    of the current request first.
+    """
+    forward_related_accessor_class = IdentityMappedForwardOneToOneDescriptor
+    related_accessor_class = IdentityMappedReverseOneToOneDescriptor
@@ -0,0 +1,105 @@
+import logging
+import multiprocessing
+import os
+import posixpath
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from culturalhub_app.models import UserProfile, UserContent
+from culturalhub_app.storage import image_storage
+from culturalhub_app.thumbnails import render_thumbnails
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Rendering jobs in the pool by the name of their image, so repeated requests for a missing thumbnail
+# don't queue the same job again while it is pending.
+_scheduled = {}
+_scheduled_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the process pool rendering thumbnails of this worker, starting it on first use.
+    Worker processes are spawned rather than forked, so they don't inherit the threads and
+    database connections of the web worker.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS,
+                                        mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def thumbnail_name(name, size):
+    """
+    Returns the storage name of a thumbnail. Stored images are named after their digest,
+    so thumbnails are shared by every object using the same image.
+    """
+    basename = posixpath.splitext(posixpath.basename(name))[0]
+    return posixpath.join('thumbs', size, basename + '.jpg')
+
+
+def missing_thumbnails(name):
+    """
+    Returns the (path, dimensions) of the thumbnails of a stored image which don't exist yet.
+    """
+    targets = []
+    for size, dimensions in settings.THUMBNAIL_SIZES.items():
+        path = image_storage.path(thumbnail_name(name, size))
+        if not os.path.exists(path):
+            targets.append((path, dimensions))
+    return targets
+
+
+def _finish(name, future):
+    with _scheduled_lock:
+        if _scheduled.get(name) is future:
+            del _scheduled[name]
+    if future.exception() is not None:
+        logger.error('Thumbnail rendering failed', exc_info=future.exception())
+
+
+def schedule_thumbnails(name):
+    """
+    Queues rendering of the missing thumbnails of a stored image in the process pool,
+    unless it is queued already, in which case the pending job is returned.
+    With THUMBNAIL_WORKERS = 0 the thumbnails are rendered synchronously, which is meant for tests only.
+    """
+    with _scheduled_lock:
+        if name in _scheduled:
+            return _scheduled[name]
+    targets = missing_thumbnails(name)
+    if not targets:
+        return None
+    if settings.THUMBNAIL_WORKERS == 0:
+        return render_thumbnails(image_storage.path(name), targets)
+    with _scheduled_lock:
+        if name in _scheduled:
+            return _scheduled[name]
+        future = _scheduled[name] = get_pool().submit(render_thumbnails, image_storage.path(name), targets)
+    # Outside of the lock: the callback runs right away if the job is done already.
+    future.add_done_callback(lambda future: _finish(name, future))
+    return future
+
+
+@receiver(post_save, sender=UserProfile)
+def schedule_avatar_thumbnails(sender, instance, **kwargs):
+    if instance.avatar:
+        name = instance.avatar.name
+        transaction.on_commit(lambda: schedule_thumbnails(name))
+
+
+@receiver(post_save, sender=UserContent)
+def schedule_content_image_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: schedule_thumbnails(name))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from culturalhub_app.models import Comment, encode_path_segment
+
+
+class Command(BaseCommand):
+    help = 'Computes the thread paths and depths of comments written before comments were threaded.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of comments updated per query.')
+
+    def handle(self, *args, **options):
+        updated = 0
+        while True:
+            with transaction.atomic():
+                # Parents have smaller ids than their replies, so they get their paths first.
+                batch = list(Comment.objects.filter(path='').select_related('parent').select_for_update(of=('self',))
+                             .order_by('id')[:options['batch_size']])
+                if not batch:
+                    break
+                threaded = {}
+                for comment in batch:
+                    parent = comment.parent
+                    if parent is None:
+                        comment.path, comment.depth = encode_path_segment(comment.id), 0
+                    else:
+                        parent_path, parent_depth = threaded.get(parent.id, (parent.path, parent.depth))
+                        if not parent_path:
+                            raise CommandError(f'The parent of comment #{comment.id} has no path.')
+                        comment.path, comment.depth = parent_path + encode_path_segment(comment.id), parent_depth + 1
+                    threaded[comment.id] = (comment.path, comment.depth)
+                Comment.objects.bulk_update(batch, ['path', 'depth'])
+            updated += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Computed the paths of {updated} comments.'))
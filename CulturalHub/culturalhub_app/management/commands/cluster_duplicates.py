@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.duplicates import index_missing, cluster_duplicates, duplicates_of_oldest
+from culturalhub_app.models import UserContent
+
+
+class Command(BaseCommand):
+    help = 'Indexes content without a MinHash signature and lists the clusters of near-duplicate content.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of rows read per query.')
+        parser.add_argument('--reindex', action='store_true',
+                            help='Recompute the signatures of all content, e.g. after changing the LSH parameters.')
+        parser.add_argument('--soft-delete', action='store_true',
+                            help='Delete the items of each cluster which are near-duplicates of its oldest item.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.DUPLICATE_BATCH_SIZE
+        indexed = index_missing(batch_size, options['reindex'])
+        if indexed:
+            self.stdout.write(f'Indexed {indexed} content items.')
+
+        clusters = cluster_duplicates(batch_size)
+        titles = dict(UserContent.objects.filter(id__in=[pk for cluster in clusters for pk in cluster])
+                      .values_list('id', 'title'))
+        for cluster in clusters:
+            self.stdout.write(', '.join(f'#{pk} {titles.get(pk, "")}' for pk in cluster))
+
+        deleted = 0
+        if options['soft_delete']:
+            deleted = UserContent.objects.filter(id__in=duplicates_of_oldest(clusters, batch_size)).soft_delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Found {len(clusters)} clusters of duplicates' + (f', deleted {deleted} items.' if deleted else '.')
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.models import StaleSnapshot
+from culturalhub_app.snapshots import all_paths, regenerate_stale_snapshots, render_snapshots
+
+
+class Command(BaseCommand):
+    help = ('Pre-renders category, content and profile pages for anonymous visitors. By default only pages changed '
+            'since the last run are rendered. Meant to be run periodically (e.g. from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Render every page, e.g. after a deployment.')
+        parser.add_argument('--workers', type=int, default=None, help='Number of rendering processes.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of stale pages claimed at a time.')
+        parser.add_argument('--loop', type=float, default=None,
+                            help='Keep running, polling for stale pages every LOOP seconds when there are none.')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            StaleSnapshot.objects.all().delete()
+            written = render_snapshots(all_paths(), options['workers'])
+            self.stdout.write(self.style.SUCCESS(f'Rendered {written} pages.'))
+            return
+
+        total = 0
+        while True:
+            processed = regenerate_stale_snapshots(options['batch_size'], options['workers'])
+            total += processed
+            if processed:
+                continue
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
+
+        self.stdout.write(self.style.SUCCESS(f'Re-rendered {total} stale pages.'))
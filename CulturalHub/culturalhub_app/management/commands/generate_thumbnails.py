@@ -0,0 +1,31 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.images import get_pool, missing_thumbnails
+from culturalhub_app.models import UserProfile, UserContent
+from culturalhub_app.storage import image_storage
+from culturalhub_app.thumbnails import render_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Renders the missing thumbnails of all avatars and content images.'
+
+    def handle(self, *args, **options):
+        names = set(UserProfile.objects.exclude(avatar='').exclude(avatar=None).values_list('avatar', flat=True))
+        names |= set(UserContent.objects.exclude(image='').exclude(image=None).values_list('image', flat=True))
+
+        futures = []
+        for name in names:
+            targets = missing_thumbnails(name)
+            if targets:
+                futures.append(get_pool().submit(render_thumbnails, image_storage.path(name), targets))
+
+        rendered = 0
+        for future in as_completed(futures):
+            try:
+                rendered += len(future.result())
+            except Exception as error:
+                self.stderr.write(f'Thumbnail rendering failed: {error}')
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} thumbnails of {len(names)} images.'))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.feed import process_feed_events
+
+
+class Command(BaseCommand):
+    help = 'Fans out queued content and comments to the activity feeds. Meant to be run periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of events processed per transaction.')
+        parser.add_argument('--loop', type=float, default=None,
+                            help='Keep running, polling the queue every LOOP seconds when it is empty.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_feed_events(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if options['loop'] is None:
+                break
+            time.sleep(options['loop'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} feed events.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.startup_profiler import profile_startup, group_by_package
+from culturalhub_app.warmup import STEPS
+
+
+class Command(BaseCommand):
+    help = 'Starts the application in a fresh interpreter and reports import and initialization time per module.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25, help='Number of the slowest modules to show.')
+        parser.add_argument('--sort', choices=['self', 'cumulative'], default='cumulative',
+                            help='Sort modules by their own import time or including their imports.')
+        parser.add_argument('--steps', nargs='*', choices=list(STEPS), default=None,
+                            help='Warm-up steps to run after loading the application, all by default.')
+
+    def handle(self, *args, **options):
+        modules, phases = profile_startup(options['steps'])
+        key = 'self_us' if options['sort'] == 'self' else 'cumulative_us'
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Initialization phases'))
+        for name, seconds in phases.items():
+            self.stdout.write(f'{seconds * 1000:10.1f} ms  {name}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Slowest modules ({len(modules)} imported)'))
+        self.stdout.write(f'{"self ms":>10} {"cumul. ms":>10}  module')
+        for timing in sorted(modules, key=lambda timing: getattr(timing, key), reverse=True)[:options['limit']]:
+            self.stdout.write(f'{timing.self_us / 1000:10.1f} {timing.cumulative_us / 1000:10.1f}  {timing.module}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Import time per package'))
+        packages = sorted(group_by_package(modules).items(), key=lambda item: item[1], reverse=True)
+        for package, self_us in packages[:options['limit']]:
+            self.stdout.write(f'{self_us / 1000:10.1f} ms  {package}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.purge import purge_deleted_content
+
+
+class Command(BaseCommand):
+    help = 'Permanently removes soft deleted content with its comments and related rows, in bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of rows deleted per statement.')
+        parser.add_argument('--grace-period', type=int, default=None,
+                            help='Only purge content deleted at least this many seconds ago.')
+        parser.add_argument('--limit', type=int, default=None, help='Maximum number of content items to purge.')
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_content(options['batch_size'], options['grace_period'], options['limit'])
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} content items.'))
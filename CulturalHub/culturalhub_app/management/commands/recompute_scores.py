@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.models import UserContent
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the ratings and ranking scores of all content from the stored votes, '
+            'e.g. for content created before the score started at RATING_PRIOR_MEAN or after changing the prior.')
+
+    def handle(self, *args, **options):
+        updated = UserContent.all_objects.update(**UserContent.rating_update(0, 0))
+        self.stdout.write(self.style.SUCCESS(f'Recomputed the scores of {updated} content items.'))
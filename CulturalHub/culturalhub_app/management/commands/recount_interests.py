@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.feed import recount_interested_profiles
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the number of users of each interest, which decides whether content tagged with it '
+            'is fanned out to the feeds. Run once after upgrading, then periodically (e.g. daily from cron).')
+
+    def handle(self, *args, **options):
+        corrected = recount_interested_profiles()
+        self.stdout.write(self.style.SUCCESS(f'Corrected the counts of {corrected} interests.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.notifications import send_comment_digests
+
+
+class Command(BaseCommand):
+    help = 'Sends digest emails about new comments. Meant to be run periodically (e.g. hourly from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Number of recipients processed per batch.')
+
+    def handle(self, *args, **options):
+        sent = send_comment_digests(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} comment digests.'))
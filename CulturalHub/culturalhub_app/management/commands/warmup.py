@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from culturalhub_app.warmup import STEPS, warm_up
+
+
+class Command(BaseCommand):
+    help = 'Runs the worker warm-up steps and reports how long each of them took.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('steps', nargs='*', choices=list(STEPS), help='Steps to run, all by default.')
+
+    def handle(self, *args, **options):
+        for name, (seconds, result) in warm_up(options['steps']).items():
+            status = 'FAILED' if result is None else result
+            self.stdout.write(f'{name:<12} {seconds * 1000:8.1f} ms  {status}')
@@ -0,0 +1,155 @@
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from culturalhub_app import db_router, identity_map, pageviews, snapshots
+from culturalhub_app.compression import COMPRESSIBLE_CONTENT_TYPES, accepted_encodings, compress
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Middleware selecting the database used for reads of a request.
+    Reads of GET/HEAD requests go to a replica, unless the user has written something within
+    the last REPLICA_PIN_SECONDS - in that case they stick to the primary, so they see their own changes.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        alias = None
+        if request.method in SAFE_METHODS and not self.is_pinned(request):
+            alias = db_router.choose_replica()
+
+        token = db_router.use_replica(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            db_router.reset_read_alias(token)
+
+        db_router.record_request(alias)
+        if request.method not in SAFE_METHODS:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            response.set_cookie(PRIMARY_PIN_COOKIE, str(time.time() + pin_seconds),
+                                max_age=pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    @staticmethod
+    def is_pinned(request):
+        """
+        Checks if the request carries a still valid primary pin cookie.
+        """
+        try:
+            return float(request.COOKIES.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Django's GZipMiddleware, which pads the compressed responses with a random number of bytes against BREACH,
+    extended with brotli (when available and accepted) and to dynamic text responses only.
+    Responses smaller than COMPRESSION_MIN_SIZE are sent as they are, since compressing them
+    costs more CPU time than it saves on the wire. Streaming responses (e.g. precompressed static files)
+    are left untouched.
+    """
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if not encodings:
+            return response
+        if encodings[0] == 'gzip':
+            return super().process_response(request, response)
+
+        compressed = compress(response.content, encodings[0], max_random_bytes=self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encodings[0]
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub(r'^"', 'W/"', response['ETag'])
+        return response
+
+
+class IdentityMapMiddleware:
+    """
+    Middleware giving each request its own identity map: related users, profiles, categories and content items
+    referenced many times during the request (e.g. the author of every comment) are fetched only once.
+    The number of saved queries is logged at DEBUG level and summed up in identity_map.get_identity_map_stats().
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with identity_map.identity_map_scope() as objects:
+            response = self.get_response(request)
+        if objects.hits:
+            logger.debug('%s %s: identity map saved %d of %d related object queries',
+                         request.method, request.path, objects.hits, objects.hits + objects.misses)
+        return response
+
+
+class PageViewMiddleware:
+    """
+    Middleware counting successful GET requests of content and profile pages, whether they are rendered
+    by the view or served from a snapshot. Views are buffered per worker, see pageviews.record_view.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        match = request.resolver_match
+        if (request.method == 'GET' and response.status_code == 200
+                and match is not None and match.url_name in pageviews.COUNTED_PAGES):
+            _, _, kwarg = pageviews.COUNTED_PAGES[match.url_name]
+            pageviews.record_view(match.url_name, match.kwargs[kwarg])
+        return response
+
+
+class SnapshotMiddleware:
+    """
+    Middleware serving anonymous GET requests of category, content and profile pages from their pre-rendered
+    snapshots, skipping the view. Requests with a query string or pending messages, and pages without
+    a snapshot, are rendered dynamically.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method not in ('GET', 'HEAD') or request.GET or request.user.is_authenticated
+                or request.resolver_match.url_name not in snapshots.PAGES or len(get_messages(request))):
+            return None
+        try:
+            content = snapshots.read_snapshot(request.path_info)
+        except SuspiciousFileOperation:
+            return None
+        if content is None:
+            return None
+        response = HttpResponse(content, content_type='text/html; charset=utf-8')
+        patch_vary_headers(response, ('Cookie',))
+        return response
@@ -1,20 +1,44 @@
 from datetime import date
-from django.db import models
+from django.conf import settings
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Window, FloatField, DecimalField
+from django.db.models.functions import RowNumber, Substr, Cast, NullIf
 from django_countries.fields import CountryField
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+from culturalhub_app.identity_map import IdentityMappedForeignKey, IdentityMappedOneToOneField
+from culturalhub_app.storage import image_storage
 
 # Create your models here.
 
 
-class UserProfile(models.Model):
-    user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name='Login', unique=True)
+class CounterFieldsMixin:
+    """
+    Leaves COUNTER_FIELDS out when an existing row is saved without update_fields. They are maintained with UPDATE
+    statements (F() expressions), possibly by other workers, so saving the whole row must not write back the values
+    which happened to be loaded.
+    """
+    COUNTER_FIELDS = ()
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        if update_fields is None and not force_insert and not self._state.adding:
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in self.COUNTER_FIELDS]
+        super().save(force_insert=force_insert, force_update=force_update, using=using, update_fields=update_fields)
+
+
+class UserProfile(CounterFieldsMixin, models.Model):
+    user = IdentityMappedOneToOneField(User, on_delete=models.CASCADE, verbose_name='Login', unique=True)
     country = CountryField(verbose_name='Country', null=True)
     birth_year = models.IntegerField(verbose_name='Birth Year', default=2000)
     about = models.TextField(verbose_name='About', null=True, blank=True)
     interests = models.ManyToManyField('Interest', verbose_name='Interests', blank=True, null=True)
-    # avatar = models.ImageField(upload_to='avatars/', blank=True, null=True, verbose_name='Avatar')
+    follower_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Followers')
+    view_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Views')
+    avatar = models.ImageField(upload_to='avatars/', storage=image_storage, blank=True, null=True, verbose_name='Avatar')
 
     @property
     def age(self):
@@ -30,13 +54,7 @@ class UserProfile(models.Model):
         if created:
             UserProfile.objects.create(user=instance)
 
-    @receiver(post_save, sender=User)
-    def save_user_profile(sender, instance, **kwargs):
-        """
-        A signal triggered when a User instance is saved.
-        Saves the associated UserProfile instance when the user is saved.
-        """
-        instance.userprofile.save()
+    COUNTER_FIELDS = ('follower_count', 'view_count')
 
     def __str__(self):
         return self.user.username
@@ -44,11 +62,39 @@ class UserProfile(models.Model):
 
 class Interest(models.Model):
     name = models.CharField(max_length=64, verbose_name='Interest')
+    profile_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Interested users')
 
     def __str__(self):
         return self.name
 
 
+@receiver(m2m_changed, sender=UserProfile.interests.through)
+def count_interested_profiles(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    A signal triggered when interests are added to or removed from profiles.
+    Keeps Interest.profile_count up to date with F() expressions, so concurrent changes don't lose updates.
+    """
+    if action == 'pre_clear':
+        pk_set = set((instance.userprofile_set if reverse else instance.interests).values_list('pk', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    if not pk_set:
+        return
+    delta = len(pk_set) if action == 'post_add' else -len(pk_set)
+    if reverse:
+        Interest.objects.filter(pk=instance.pk).update(profile_count=F('profile_count') + delta)
+    else:
+        Interest.objects.filter(pk__in=pk_set).update(profile_count=F('profile_count') + (1 if delta > 0 else -1))
+
+
+@receiver(pre_delete, sender=UserProfile)
+def uncount_deleted_profile(sender, instance, **kwargs):
+    """
+    A signal triggered before a profile is deleted, whose interests are then removed without m2m_changed.
+    """
+    Interest.objects.filter(userprofile=instance).update(profile_count=F('profile_count') - 1)
+
+
 class Category(models.Model):
     name = models.CharField(max_length=64, verbose_name='Category name')
     description = models.TextField(verbose_name='Category description')
@@ -57,29 +103,418 @@ class Category(models.Model):
         return self.name
 
 
-class UserContent(models.Model):
+# Sent with the ids of content items which were soft deleted.
+content_soft_deleted = Signal()
+# Sent with the lists of created and updated content items saved in bulk, which bypasses post_save.
+content_batch_saved = Signal()
+
+
+class UserContentQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """
+        Hides the content items immediately, their rows and related rows are removed later by purge_deleted_content.
+        """
+        ids = list(self.filter(deleted_at__isnull=True).values_list('id', flat=True))
+        UserContent.all_objects.filter(id__in=ids).update(deleted_at=timezone.now())
+        content_soft_deleted.send(sender=UserContent, ids=ids)
+        return len(ids)
+
+
+class VisibleContentManager(models.Manager.from_queryset(UserContentQuerySet)):
+    """
+    Default manager of UserContent, excluding soft deleted items.
+    """
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+def prior_score():
+    """
+    Returns the ranking score of content without votes, the same value UserContent.rating_update gives for zero votes.
+    """
+    return getattr(settings, 'RATING_PRIOR_MEAN', 3.0)
+
+
+class UserContent(CounterFieldsMixin, models.Model):
     title = models.CharField(max_length=255, verbose_name='Title')
     description = models.TextField(verbose_name='Description')
     date = models.DateField(verbose_name='Date', blank=True, null=True)
     location = models.CharField(max_length=255, verbose_name='Location', blank=True)
-    author = models.ForeignKey(UserProfile, on_delete=models.CASCADE, verbose_name='Organizer')
-    category = models.ForeignKey(Category, on_delete=models.CASCADE, verbose_name='Category')
+    author = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, verbose_name='Organizer')
+    category = IdentityMappedForeignKey(Category, on_delete=models.CASCADE, verbose_name='Category')
     interests = models.ManyToManyField('Interest', verbose_name='Interests')
     culture = models.CharField(max_length=255, verbose_name='Culture')
+    image = models.ImageField(upload_to='content/', storage=image_storage, blank=True, null=True, verbose_name='Image')
+    created_at = models.DateTimeField(auto_now_add=True, null=True, verbose_name='Created At')
     rating = models.DecimalField(
         max_digits=3, decimal_places=2,
-        verbose_name='Rating', null=True, blank=True
+        verbose_name='Rating', null=True, blank=True, editable=False
     )
+    rating_sum = models.PositiveIntegerField(default=0, editable=False, verbose_name='Sum of votes')
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Number of votes')
+    score = models.FloatField(default=prior_score, editable=False, verbose_name='Ranking score')
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, db_index=True, verbose_name='Deleted At')
+    view_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Views')
+
+    objects = VisibleContentManager()
+    all_objects = UserContentQuerySet.as_manager()
+
+    # Changed by votes, page views and soft deletion only.
+    COUNTER_FIELDS = ('rating', 'rating_sum', 'rating_count', 'score', 'view_count', 'deleted_at')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='usercontent_score_idx'),
+            models.Index(fields=['category', '-view_count'], name='usercontent_category_views_idx'),
+        ]
+
+    @staticmethod
+    def rating_update(sum_delta, count_delta):
+        """
+        Returns the field expressions of an UPDATE applying a change of the votes to the stored aggregates.
+
+        All expressions refer to the current column values, so concurrent votes are serialized by the row lock
+        of the UPDATE and never lose increments. The score is the Bayesian average of the votes, pulled towards
+        RATING_PRIOR_MEAN with the weight of RATING_PRIOR_WEIGHT votes, so items with few votes don't top the ranking.
+        """
+        prior_mean = getattr(settings, 'RATING_PRIOR_MEAN', 3.0)
+        prior_weight = getattr(settings, 'RATING_PRIOR_WEIGHT', 5)
+        new_sum = Cast(F('rating_sum') + sum_delta, FloatField())
+        new_count = F('rating_count') + count_delta
+        return {
+            'rating_sum': F('rating_sum') + sum_delta,
+            'rating_count': new_count,
+            'rating': Cast(new_sum / NullIf(new_count, 0), DecimalField(max_digits=3, decimal_places=2)),
+            'score': (new_sum + prior_weight * prior_mean) / (new_count + prior_weight),
+        }
+
+    def soft_delete(self):
+        UserContent.objects.filter(pk=self.pk).soft_delete()
+        self.deleted_at = timezone.now()
 
     def __str__(self):
         return self.title
 
 
-class Comment(models.Model):
-    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, verbose_name='User')
-    commented_content = models.ForeignKey(UserContent, on_delete=models.CASCADE, verbose_name='commented_content')
+class RatingVote(models.Model):
+    user = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, verbose_name='User')
+    content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE, verbose_name='Content')
+    value = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(5)], verbose_name='Rating'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'content'], name='unique_rating_vote'),
+        ]
+
+    @classmethod
+    def cast(cls, user, content, value):
+        """
+        Records the vote of a user, replacing their previous vote on the content,
+        and incrementally updates the rating aggregates stored on the content.
+        """
+        with transaction.atomic():
+            vote = cls.objects.select_for_update().filter(user=user, content=content).first()
+            if vote is None:
+                try:
+                    with transaction.atomic():
+                        vote = cls.objects.create(user=user, content=content, value=value)
+                except IntegrityError:
+                    # The same user voted concurrently, the vote exists now and can be changed instead.
+                    return cls.cast(user, content, value)
+                sum_delta, count_delta = value, 1
+            else:
+                sum_delta, count_delta = value - vote.value, 0
+                vote.value = value
+                vote.save(update_fields=['value'])
+
+            if sum_delta or count_delta:
+                UserContent.objects.filter(pk=content.pk).update(**UserContent.rating_update(sum_delta, count_delta))
+        return vote
+
+    @receiver(post_delete, sender='culturalhub_app.RatingVote')
+    def remove_vote(sender, instance, **kwargs):
+        """
+        A signal triggered when a vote is deleted (e.g. with its user).
+        Subtracts the vote from the aggregates of the rated content.
+        """
+        UserContent.objects.filter(pk=instance.content_id).update(**UserContent.rating_update(-instance.value, -1))
+
+    def __str__(self):
+        return f'{self.user} - {self.content}: {self.value}'
+
+
+PATH_STEP = 8
+PATH_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def encode_path_segment(number):
+    """
+    Encodes a comment id as a fixed-width base36 segment of a materialized path.
+    Fixed width keeps the lexicographic order of paths equal to the depth-first order of the thread.
+    """
+    segment = ''
+    while number:
+        number, digit = divmod(number, 36)
+        segment = PATH_ALPHABET[digit] + segment
+    return segment.rjust(PATH_STEP, '0')
+
+
+def path_upper_bound(path):
+    """
+    Returns the smallest path greater than the given path and all of its descendants.
+    Subtrees are fetched with path__gte=path, path__lt=path_upper_bound(path), which is a plain index range scan.
+    """
+    return path[:-PATH_STEP] + encode_path_segment(int(path[-PATH_STEP:], 36) + 1)
+
+
+class CommentQuerySet(models.QuerySet):
+    def roots(self, content):
+        """
+        Returns the top-level comments of the content, oldest first.
+        Comments written before threading have no path until backfill_comment_paths has run and are left out,
+        the range queries below can't find them.
+        """
+        return self.filter(commented_content=content, depth=0).exclude(path='').order_by('path')
+
+    def subtree(self, comment):
+        """
+        Returns the comment with all of its replies in depth-first order.
+        """
+        if not comment.path:
+            return self.filter(pk=comment.pk)
+        return self.filter(
+            commented_content_id=comment.commented_content_id,
+            path__gte=comment.path, path__lt=path_upper_bound(comment.path),
+        ).order_by('path')
+
+    def threads(self, roots, max_depth=1, replies_per_thread=3):
+        """
+        Returns the given consecutive root comments together with the first replies of each thread
+        (up to max_depth levels and replies_per_thread replies per thread) using a single range query.
+        """
+        if not roots:
+            return self.none()
+        return self.filter(
+            commented_content_id=roots[0].commented_content_id,
+            path__gte=roots[0].path, path__lt=path_upper_bound(roots[-1].path),
+            depth__lte=max_depth,
+        ).annotate(
+            thread_position=Window(RowNumber(), partition_by=[Substr('path', 1, PATH_STEP)], order_by=F('path').asc()),
+        ).filter(thread_position__lte=replies_per_thread + 1).order_by('path')
+
+
+class Comment(CounterFieldsMixin, models.Model):
+    MAX_DEPTH = 30
+    COUNTER_FIELDS = ('reply_count',)
+
+    user = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, verbose_name='User')
+    commented_content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE,
+                                                 verbose_name='commented_content')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='replies', verbose_name='Reply to')
     text = models.TextField(verbose_name='Comment')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    path = models.CharField(max_length=PATH_STEP * (MAX_DEPTH + 1), editable=False, verbose_name='Thread path')
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Depth')
+    reply_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Replies')
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['path']
+        indexes = [
+            models.Index(fields=['commented_content', 'path']),
+            models.Index(fields=['commented_content', 'depth', 'path']),
+        ]
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        """
+        Overrides the save method to assign the materialized path of a new comment.
+        The path is the parent's path followed by the encoded id of the comment, so it can only be
+        set once the row has an id. Replies deeper than MAX_DEPTH are attached to the parent's parent.
+        """
+        if self.pk is not None:
+            return super().save(force_insert=force_insert, force_update=force_update, using=using,
+                                update_fields=update_fields)
+
+        with transaction.atomic():
+            if self.parent is not None and self.parent.depth >= self.MAX_DEPTH:
+                self.parent = self.parent.parent
+            self.depth = self.parent.depth + 1 if self.parent else 0
+            super().save(force_insert=force_insert, force_update=force_update, using=using,
+                         update_fields=update_fields)
+            self.path = (self.parent.path if self.parent else '') + encode_path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+            if self.parent is not None:
+                Comment.objects.filter(pk=self.parent.pk).update(reply_count=F('reply_count') + 1)
 
     def __str__(self):
         return f'{self.user.user.username} - {self.created_at}'
+
+
+class Follow(models.Model):
+    follower = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, related_name='following',
+                                        verbose_name='Follower')
+    author = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, related_name='followers',
+                                      verbose_name='Author')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='unique_follow'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower} follows {self.author}'
+
+
+class FeedEvent(models.Model):
+    """
+    New content or comment waiting to be fanned out to the feeds of interested users.
+    Rows are inserted in the same transaction as the content or comment and consumed by the process_feed command.
+    """
+    content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE, verbose_name='Content')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True, verbose_name='Comment')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+
+
+class FeedItem(models.Model):
+    FOLLOWED_AUTHOR = 'author'
+    INTEREST = 'interest'
+    COMMENT = 'comment'
+    REASONS = [
+        (FOLLOWED_AUTHOR, 'New content from an author you follow'),
+        (INTEREST, 'New content matching your interests'),
+        (COMMENT, 'New comment'),
+    ]
+
+    owner = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, related_name='feed_items',
+                                     verbose_name='Owner')
+    content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE, verbose_name='Content')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, null=True, blank=True, verbose_name='Comment')
+    reason = models.CharField(max_length=16, choices=REASONS, verbose_name='Reason')
+    created_at = models.DateTimeField(verbose_name='Created At')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-id'], name='feeditem_owner_created_idx'),
+        ]
+
+    @receiver(post_save, sender=UserContent)
+    def queue_content(sender, instance, created, **kwargs):
+        """
+        A signal triggered when a UserContent instance is saved.
+        Queues new content to be fanned out to the feeds.
+        """
+        if created:
+            FeedEvent.objects.create(content=instance)
+
+    @receiver(post_save, sender=Comment)
+    def queue_comment(sender, instance, created, **kwargs):
+        """
+        A signal triggered when a Comment instance is saved.
+        Queues new comments to be fanned out to the feeds.
+        """
+        if created:
+            FeedEvent.objects.create(content_id=instance.commented_content_id, comment=instance)
+
+    def __str__(self):
+        return f'{self.owner} - {self.content}'
+
+
+class CommentNotification(models.Model):
+    """
+    Pending notification about a new comment, sent to its recipient in the next digest email.
+    """
+    recipient = IdentityMappedForeignKey(UserProfile, on_delete=models.CASCADE, related_name='comment_notifications',
+                                         verbose_name='Recipient')
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, verbose_name='Comment')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'id'], name='notification_recipient_idx'),
+        ]
+
+    @receiver(post_save, sender=Comment)
+    def queue_notifications(sender, instance, created, **kwargs):
+        """
+        A signal triggered when a Comment instance is saved.
+        Queues a notification for the author of the commented content and, for replies, the author of the parent comment.
+        """
+        if not created:
+            return
+        recipients = {instance.commented_content.author_id}
+        if instance.parent is not None:
+            recipients.add(instance.parent.user_id)
+        recipients.discard(instance.user_id)
+        CommentNotification.objects.bulk_create(
+            [CommentNotification(recipient_id=recipient_id, comment=instance) for recipient_id in recipients]
+        )
+
+    def __str__(self):
+        return f'{self.recipient} - {self.comment}'
+
+
+class StaleSnapshot(models.Model):
+    """
+    Path of a pre-rendered page whose snapshot is outdated.
+    Rows are inserted in the same transaction as the change and consumed by the generate_snapshots command.
+    """
+    path = models.CharField(max_length=512, unique=True, verbose_name='Path')
+    marked_at = models.DateTimeField(auto_now_add=True, verbose_name='Marked At')
+
+    def __str__(self):
+        return self.path
+
+
+class ContentRevision(models.Model):
+    """
+    Title and description of a content item before one of its edits.
+    The text is stored as a compressed reverse delta against the text after the edit, see culturalhub_app.revisions.
+    """
+    content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE, related_name='revisions',
+                                       verbose_name='Content')
+    number = models.PositiveIntegerField(verbose_name='Number')
+    editor = IdentityMappedForeignKey(UserProfile, on_delete=models.SET_NULL, null=True, blank=True,
+                                      related_name='content_revisions', verbose_name='Editor')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    keyframe = models.BooleanField(default=False, verbose_name='Stores the full text')
+    after_hash = models.CharField(max_length=16, blank=True, verbose_name='Hash of the text after the edit')
+    title_delta = models.BinaryField(verbose_name='Title delta')
+    description_delta = models.BinaryField(verbose_name='Description delta')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['content', 'number'], name='unique_content_revision'),
+        ]
+
+    def __str__(self):
+        return f'{self.content} - revision {self.number}'
+
+
+class ContentSignature(models.Model):
+    """
+    MinHash signature of the title and description of a content item, see culturalhub_app.duplicates.
+    """
+    content = IdentityMappedOneToOneField(UserContent, on_delete=models.CASCADE, primary_key=True,
+                                          related_name='signature', verbose_name='Content')
+    signature = models.BinaryField(verbose_name='MinHash signature')
+
+    def __str__(self):
+        return f'{self.content} - signature'
+
+
+class ContentBucket(models.Model):
+    """
+    LSH bucket of a content item: items sharing a bucket key have an equal band of their MinHash signatures
+    and are compared as possible duplicates.
+    """
+    content = IdentityMappedForeignKey(UserContent, on_delete=models.CASCADE, related_name='lsh_buckets',
+                                       verbose_name='Content')
+    key = models.BigIntegerField(db_index=True, verbose_name='Bucket key')
+
+    def __str__(self):
+        return f'{self.content} - bucket {self.key}'
@@ -0,0 +1,75 @@
+import logging
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from culturalhub_app.models import CommentNotification
+
+logger = logging.getLogger(__name__)
+
+
+def build_digest(recipient, notifications):
+    """
+    Returns the digest email telling a recipient about their new comments, or None if they have no email address.
+    """
+    email = recipient.user.email
+    if not email:
+        return None
+    shown = notifications[:settings.COMMENT_DIGEST_MAX_ITEMS]
+    body = render_to_string('emails/comment_digest.txt', {
+        'recipient': recipient,
+        'notifications': shown,
+        'hidden_count': len(notifications) - len(shown),
+        'count': len(notifications),
+        'site_url': settings.SITE_URL,
+    })
+    subject = f'{len(notifications)} new comment{"s" if len(notifications) > 1 else ""} on CulturalHub'
+    return EmailMessage(subject, body, to=[email])
+
+
+def send_comment_digests(batch_size=None):
+    """
+    Sends one digest email per recipient of pending comment notifications and deletes the sent notifications.
+
+    Recipients are processed in batches of COMMENT_DIGEST_BATCH_SIZE over one SMTP connection reused for the
+    whole run. The notifications of a batch stay locked until it is sent, and runs skip the rows locked by another
+    one, so concurrent runs don't send the same digest twice. The notifications of digests which failed to send
+    are kept for the next run, as are the ones queued while the digests are being sent.
+
+    :return: Number of sent emails.
+    """
+    batch_size = batch_size or settings.COMMENT_DIGEST_BATCH_SIZE
+    sent = 0
+    last_recipient_id = 0
+    with get_connection(fail_silently=True) as connection:
+        while True:
+            recipient_ids = list(
+                CommentNotification.objects.filter(recipient_id__gt=last_recipient_id)
+                .order_by('recipient_id').values_list('recipient_id', flat=True).distinct()[:batch_size]
+            )
+            if not recipient_ids:
+                break
+            last_recipient_id = recipient_ids[-1]
+
+            with transaction.atomic():
+                notifications = list(
+                    CommentNotification.objects.filter(recipient_id__in=recipient_ids)
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .select_related('recipient__user', 'comment__user__user', 'comment__commented_content')
+                    .order_by('recipient_id', 'id')
+                )
+                done = []
+                for _, group in groupby(notifications, key=lambda notification: notification.recipient_id):
+                    group = list(group)
+                    message = build_digest(group[0].recipient, group)
+                    if message is not None:
+                        if not connection.send_messages([message]):
+                            logger.error('Comment digest to %s could not be sent', message.to[0])
+                            continue
+                        sent += 1
+                    done.extend(notification.id for notification in group)
+                CommentNotification.objects.filter(id__in=done).delete()
+    return sent
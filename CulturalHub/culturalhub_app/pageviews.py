@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Case, F, Value, When
+
+from culturalhub_app.models import UserProfile, UserContent
+
+logger = logging.getLogger(__name__)
+
+# URL name of a counted page -> (model, field identifying the viewed object, URL keyword argument holding its value).
+COUNTED_PAGES = {
+    'content-view': (UserContent, 'id', 'content_id'),
+    'user': (UserProfile, 'user_id', 'user_id'),
+}
+
+_pending = Counter()
+_pending_total = 0
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+# Background thread flushing the buffer of this process, and the event waking it up before its time.
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+_wake = threading.Event()
+
+
+def record_view(url_name, key):
+    """
+    Counts a view of a page in the buffer of this worker. The buffer is flushed by a background thread every
+    PAGE_VIEW_FLUSH_SECONDS, or as soon as it holds PAGE_VIEW_FLUSH_THRESHOLD views, so requests never wait
+    for the database writes.
+
+    :param url_name: One of COUNTED_PAGES.
+    :param key: Value identifying the viewed object, e.g. the content id.
+    """
+    global _pending_total
+    with _pending_lock:
+        _pending[url_name, key] += 1
+        _pending_total += 1
+        full = _pending_total >= settings.PAGE_VIEW_FLUSH_THRESHOLD
+    start_flusher()
+    if full:
+        _wake.set()
+
+
+def start_flusher():
+    """
+    Starts the flushing thread of this process, unless it is running already. Threads don't survive a fork,
+    so a worker forked from a process which had one starts its own.
+    """
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid() and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher_pid != os.getpid() or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_periodically, name='page-view-flusher', daemon=True)
+            _flusher.start()
+            _flusher_pid = os.getpid()
+
+
+def _flush_periodically():
+    while True:
+        # Recomputed after every wait, so a changed PAGE_VIEW_FLUSH_SECONDS takes effect.
+        remaining = _last_flush + settings.PAGE_VIEW_FLUSH_SECONDS - time.monotonic()
+        if remaining > 0 and not _wake.wait(remaining):
+            continue
+        _wake.clear()
+        close_old_connections()
+        try:
+            flush_views()
+        except Exception:
+            logger.exception('Flushing page views failed')
+
+
+def get_pending_views():
+    """
+    Returns a dict mapping (url_name, key) to the views of this worker which are not flushed yet.
+    """
+    with _pending_lock:
+        return dict(_pending)
+
+
+def reset_pending_views():
+    global _pending_total
+    with _pending_lock:
+        _pending.clear()
+        _pending_total = 0
+
+
+def _add_views(model, field, increments):
+    """
+    Adds the increments to the view counts of a model with a single UPDATE. The rows are locked in key order first,
+    so workers flushing overlapping rows at the same time wait for each other instead of deadlocking.
+    """
+    with transaction.atomic():
+        list(model._base_manager.filter(**{f'{field}__in': increments}).order_by(field)
+             .select_for_update().values_list('pk', flat=True))
+        model._base_manager.filter(**{f'{field}__in': increments}).update(view_count=F('view_count') + Case(
+            *[When(**{field: key}, then=Value(count)) for key, count in increments.items()], default=Value(0)
+        ))
+
+
+def flush_views():
+    """
+    Writes the buffered views of this worker to the database and empties the buffer.
+
+    Counts are incremented (views = views + n) rather than overwritten, so the buffers of all workers add up
+    without lost updates. Rows are updated PAGE_VIEW_BATCH_SIZE at a time, each batch in a short transaction.
+    Views of batches which could not be written are put back into the buffer for the next flush.
+
+    :return: Number of flushed views.
+    """
+    global _pending_total, _last_flush
+    with _pending_lock:
+        pending = _pending.copy()
+        _pending.clear()
+        _pending_total = 0
+        _last_flush = time.monotonic()
+
+    flushed = 0
+    for url_name, (model, field, _) in COUNTED_PAGES.items():
+        increments = sorted((key, count) for (name, key), count in pending.items() if name == url_name)
+        for start in range(0, len(increments), settings.PAGE_VIEW_BATCH_SIZE):
+            batch = dict(increments[start:start + settings.PAGE_VIEW_BATCH_SIZE])
+            try:
+                _add_views(model, field, batch)
+            except DatabaseError:
+                logger.exception('Flushing %s page views failed', url_name)
+                continue
+            for key, count in batch.items():
+                del pending[url_name, key]
+                flushed += count
+
+    if pending:
+        with _pending_lock:
+            _pending.update(pending)
+            _pending_total += sum(pending.values())
+    return flushed
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from culturalhub_app.models import UserContent
+
+
+def _raw_delete(model, ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(ids))})', ids)
+        return cursor.rowcount
+
+
+def _raw_set_null(model, column, ids):
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {table} SET {column} = NULL WHERE {column} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def _dependents(model):
+    """
+    Yields (model, column, on_delete) of the foreign keys and many-to-many through tables pointing at a model.
+    """
+    for relation in model._meta.related_objects:
+        if relation.many_to_many:
+            yield relation.through, relation.field.m2m_reverse_name(), models.CASCADE
+        else:
+            yield relation.related_model, relation.field.column, relation.on_delete
+    for field in model._meta.local_many_to_many:
+        yield field.remote_field.through, field.m2m_column_name(), models.CASCADE
+
+
+def delete_in_batches(model, column, values, batch_size):
+    """
+    Deletes the rows of a model whose column is one of values, together with all rows depending on them.
+
+    Unlike QuerySet.delete(), no objects are loaded into Python and no signals are sent: ids are selected
+    batch_size at a time, the rows depending on them are deleted first (recursively, also in batches),
+    then the batch itself with a single raw DELETE. Every batch is committed on its own, and since dependents
+    go first, an interrupted purge never leaves orphaned rows behind.
+
+    :return: Number of deleted rows of the model itself.
+    """
+    deleted = 0
+    while True:
+        ids = list(model._base_manager.filter(**{f'{column}__in': values})
+                   .order_by('-pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        for dependent, dependent_column, on_delete in _dependents(model):
+            if on_delete is models.CASCADE:
+                delete_in_batches(dependent, dependent_column, ids, batch_size)
+            elif on_delete is models.SET_NULL:
+                _raw_set_null(dependent, dependent_column, ids)
+            elif on_delete is not models.DO_NOTHING:
+                raise ValueError(f'{dependent.__name__}.{dependent_column} can not be purged in batches.')
+        with transaction.atomic():
+            deleted += _raw_delete(model, ids)
+
+
+def purge_deleted_content(batch_size=None, grace_period=None, limit=None):
+    """
+    Permanently removes soft deleted content items with their comments, votes and other related rows.
+
+    :param grace_period: Only items deleted at least this many seconds ago are purged (PURGE_GRACE_SECONDS by default).
+    :param limit: Maximum number of content items purged in this run.
+    :return: Number of purged content items.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    grace_period = settings.PURGE_GRACE_SECONDS if grace_period is None else grace_period
+    deleted_before = timezone.now() - timedelta(seconds=grace_period)
+    ids = UserContent.all_objects.filter(deleted_at__lte=deleted_before).order_by('deleted_at').values_list('id', flat=True)
+    if limit is not None:
+        ids = ids[:limit]
+
+    purged = 0
+    for content_id in list(ids):
+        purged += delete_in_batches(UserContent, 'id', [content_id], batch_size)
+    return purged
@@ -0,0 +1,212 @@
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Min
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+
+from culturalhub_app.models import UserContent, ContentRevision
+
+# Words with the whitespace following them; diffs are computed on these tokens.
+TOKEN = re.compile(r'\s+|\S+\s*')
+
+
+def tokenize(text):
+    return TOKEN.findall(text)
+
+
+def _opcodes(a, b):
+    """
+    Returns the SequenceMatcher opcodes turning the token list a into b. The common prefix and suffix are matched
+    up front, so a typical edit touching one part of a long text only runs the quadratic matcher on that part.
+    """
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(a), len(b)) - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+
+    opcodes = [('equal', 0, prefix, 0, prefix)] if prefix else []
+    matcher = SequenceMatcher(None, a[prefix:len(a) - suffix], b[prefix:len(b) - suffix], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+    if suffix:
+        opcodes.append(('equal', len(a) - suffix, len(a), len(b) - suffix, len(b)))
+    return opcodes
+
+
+def text_hash(title, description):
+    """
+    Returns a short hash of a title and description, stored with each revision to verify the text its delta
+    is applied to.
+    """
+    return blake2b(f'{title}\x00{description}'.encode(), digest_size=8).hexdigest()
+
+
+def _pack(ops):
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode())
+
+
+def make_delta(new, old, full=False):
+    """
+    Encodes how to turn the new text back into the old one: a compressed list of [start, end] token ranges
+    copied from the new text and strings inserted between them.
+    A delta never takes more space than the compressed old text, which is stored instead when it is smaller
+    or when full is set.
+    """
+    whole = _pack([old])
+    if full:
+        return whole
+    new_tokens, old_tokens = tokenize(new), tokenize(old)
+    ops = []
+    for tag, i1, i2, j1, j2 in _opcodes(new_tokens, old_tokens):
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(old_tokens[j1:j2]))
+    delta = _pack(ops)
+    return delta if len(delta) < len(whole) else whole
+
+
+def apply_delta(new, delta):
+    tokens = tokenize(new)
+    return ''.join(
+        ''.join(tokens[op[0]:op[1]]) if isinstance(op, list) else op for op in json.loads(zlib.decompress(delta))
+    )
+
+
+def diff(old, new):
+    """
+    Returns a list of (operation, text) pairs turning the old text into the new one,
+    the operation being 'equal', 'delete' or 'insert'.
+    """
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    parts = []
+    for tag, i1, i2, j1, j2 in _opcodes(old_tokens, new_tokens):
+        if tag == 'equal':
+            parts.append(('equal', ''.join(old_tokens[i1:i2])))
+            continue
+        if i2 > i1:
+            parts.append(('delete', ''.join(old_tokens[i1:i2])))
+        if j2 > j1:
+            parts.append(('insert', ''.join(new_tokens[j1:j2])))
+    return parts
+
+
+def record_revisions(changes, editor=None):
+    """
+    Stores a revision for each edited content item and drops revisions beyond REVISION_HISTORY_LIMIT.
+    Must be called in the transaction saving the items, after their rows were locked, so that no other edit
+    gets between the text before and after this one. Content saved with save() is recorded automatically,
+    this is needed for bulk updates only.
+
+    :param changes: Iterable of (content, old title, old description) tuples; the content holds the new text.
+                    Items whose title and description didn't change are skipped.
+    :return: List of the created revisions.
+    """
+    changes = [(content, title, description) for content, title, description in changes
+               if (content.title, content.description) != (title, description)]
+    if not changes:
+        return []
+
+    latest = dict(ContentRevision.objects.filter(content__in=[content for content, _, _ in changes])
+                  .values_list('content').annotate(latest=Max('number')))
+    revisions = []
+    for content, title, description in changes:
+        number = latest.get(content.id, 0) + 1
+        keyframe = number % settings.REVISION_KEYFRAME_INTERVAL == 0
+        revisions.append(ContentRevision(
+            content=content, number=number, editor=editor, keyframe=keyframe,
+            after_hash=text_hash(content.title, content.description),
+            title_delta=make_delta(content.title, title, keyframe),
+            description_delta=make_delta(content.description, description, keyframe),
+        ))
+    ContentRevision.objects.bulk_create(revisions)
+
+    for revision in revisions:
+        if revision.number > settings.REVISION_HISTORY_LIMIT:
+            # Deltas point from newer to older text, so the oldest revisions can go without affecting the others.
+            ContentRevision.objects.filter(
+                content=revision.content, number__lte=revision.number - settings.REVISION_HISTORY_LIMIT
+            ).delete()
+    return revisions
+
+
+def latest_revisions(content, limit=None, before=None):
+    """
+    Returns the newest revisions of a content item without their deltas, read with a range scan
+    of the (content, number) index.
+
+    :param before: Only revisions with a lower number are returned, for paging through older revisions.
+    """
+    revisions = content.revisions.defer('title_delta', 'description_delta').select_related('editor__user')
+    if before is not None:
+        revisions = revisions.filter(number__lt=before)
+    return list(revisions.order_by('-number')[:limit or settings.REVISIONS_PER_PAGE])
+
+
+def get_revision_texts(content, number):
+    """
+    Restores the text of a content item before and after the edit of a revision.
+    Deltas are applied from the nearest newer keyframe (or the current text) back to the revision,
+    so at most REVISION_KEYFRAME_INTERVAL + 1 of them are read.
+
+    :return: Tuple of ((title, description) before the edit, (title, description) after the edit).
+    :raises ContentRevision.DoesNotExist: The content has no such revision (anymore), or its text was changed
+                                          without recording a revision (e.g. with update()) since then.
+    """
+    keyframe = content.revisions.filter(number__gt=number, keyframe=True).aggregate(Min('number'))['number__min']
+    revisions = content.revisions.filter(number__gte=number)
+    if keyframe is not None:
+        revisions = revisions.filter(number__lte=keyframe)
+    revisions = list(revisions.order_by('-number'))
+    if not revisions or revisions[-1].number != number:
+        raise ContentRevision.DoesNotExist(f'{content} has no revision {number}.')
+
+    text = after = (content.title, content.description)
+    for revision in revisions:
+        # A keyframe the walk starts from stores the full text, every other delta has to match the text after it.
+        if (revision.number == number or not revision.keyframe) \
+                and revision.after_hash and revision.after_hash != text_hash(*text):
+            raise ContentRevision.DoesNotExist(
+                f'{content} was changed without recording a revision after revision {revision.number}, '
+                f'so revision {number} can not be restored.'
+            )
+        after = text
+        text = (apply_delta(text[0], revision.title_delta), apply_delta(text[1], revision.description_delta))
+    return text, after
+
+
+def edited_by(content, editor):
+    """
+    Sets the profile the next save of a content item is credited to in its revision history.
+    """
+    content._revision_editor = editor
+    return content
+
+
+@receiver(pre_save, sender=UserContent)
+def remember_stored_text(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Reads the stored title and description before an existing content item is saved, locking its row in
+    a transaction, so the revision of the save is made against the text it actually replaces.
+    """
+    if raw or instance.pk is None or (update_fields is not None and not {'title', 'description'} & set(update_fields)):
+        return
+    stored = UserContent.all_objects.filter(pk=instance.pk)
+    if connection.in_atomic_block:
+        stored = stored.select_for_update()
+    instance._revision_before = stored.values_list('title', 'description').first()
+
+
+@receiver(post_save, sender=UserContent)
+def record_saved_revision(sender, instance, created, **kwargs):
+    before = instance.__dict__.pop('_revision_before', None)
+    if before is not None and not created:
+        record_revisions([(instance, *before)], instance.__dict__.pop('_revision_editor', None))
@@ -0,0 +1,280 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.urls import Resolver404, resolve, reverse
+from django.utils._os import safe_join
+
+from culturalhub_app.models import (UserProfile, Category, Interest, UserContent, Comment, RatingVote, Follow,
+                                    StaleSnapshot, content_soft_deleted, content_batch_saved)
+
+# URL names of the pages which look the same for every anonymous visitor.
+PAGES = {'category', 'content-view', 'user'}
+
+
+def category_path(name):
+    return unquote(reverse('category', kwargs={'category': name}))
+
+
+def content_path(content_id):
+    return reverse('content-view', kwargs={'content_id': content_id})
+
+
+def profile_path(user_id):
+    return reverse('user', kwargs={'user_id': user_id})
+
+
+def all_paths():
+    """
+    Yields the paths of all pages which are pre-rendered.
+    """
+    for name in Category.objects.values_list('name', flat=True):
+        yield category_path(name)
+    for content_id in UserContent.objects.values_list('id', flat=True):
+        yield content_path(content_id)
+    for user_id in UserProfile.objects.values_list('user_id', flat=True):
+        yield profile_path(user_id)
+
+
+def snapshot_file(path):
+    """
+    Returns the file of the snapshot of a page. Raises SuspiciousFileOperation for paths outside SNAPSHOT_ROOT.
+    """
+    return safe_join(settings.SNAPSHOT_ROOT, path.strip('/'), 'index.html')
+
+
+def read_snapshot(path):
+    """
+    Returns the stored HTML of a page, or None if it has no snapshot.
+    """
+    try:
+        with open(snapshot_file(path), 'rb') as snapshot:
+            return snapshot.read()
+    except FileNotFoundError:
+        return None
+
+
+def remove_snapshots(paths):
+    for path in paths:
+        try:
+            os.remove(snapshot_file(path))
+        except FileNotFoundError:
+            pass
+
+
+def render_page(path):
+    """
+    Renders a page the way an anonymous visitor gets it.
+
+    :return: The response of the view, or None if the path is not one of the pre-rendered PAGES.
+    """
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    if match.url_name not in PAGES:
+        return None
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.META = {'HTTP_HOST': urlsplit(settings.SITE_URL).netloc, 'SERVER_PORT': '80'}
+    request.user = AnonymousUser()
+    # Messages added by the view (e.g. about missing objects) are dropped with the response.
+    request._messages = CookieStorage(request)
+    return match.func(request, *match.args, **match.kwargs)
+
+
+def write_snapshot(path):
+    """
+    Renders a page and stores its snapshot. Pages which don't render anymore (e.g. deleted content) lose their snapshot.
+    The file is replaced atomically, so readers never see a partially written page.
+
+    :return: True if the snapshot was written.
+    """
+    response = render_page(path)
+    if response is None or response.status_code != 200:
+        remove_snapshots([path])
+        return False
+
+    file_path = snapshot_file(path)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temporary_path = f'{file_path}.{os.getpid()}.tmp'
+    with open(temporary_path, 'wb') as snapshot:
+        snapshot.write(response.content)
+    os.replace(temporary_path, file_path)
+    return True
+
+
+def render_snapshots(paths, workers=None):
+    """
+    Writes the snapshots of the given pages.
+    Pages are rendered in SNAPSHOT_WORKERS spawned processes, each setting up Django and opening its own
+    database connection. With 0 workers they are rendered in this process, which is meant for tests only.
+
+    :return: Number of written snapshots.
+    """
+    paths = list(paths)
+    workers = settings.SNAPSHOT_WORKERS if workers is None else workers
+    if workers == 0 or len(paths) < 2:
+        return sum(map(write_snapshot, paths))
+
+    # Spawned processes inherit the environment, so they set up Django with the same settings.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=django.setup) as pool:
+        return sum(pool.map(write_snapshot, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+
+def regenerate_stale_snapshots(batch_size=None, workers=None):
+    """
+    Re-renders a batch of pages marked as stale.
+    Marks are claimed with SKIP LOCKED, so several processes can work through them at the same time. A page changed
+    again while it is being rendered is marked anew and rendered in the next run.
+
+    :return: Number of processed pages.
+    """
+    batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+    with transaction.atomic():
+        stale = list(StaleSnapshot.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+        StaleSnapshot.objects.filter(id__in=[mark.id for mark in stale]).delete()
+    render_snapshots([mark.path for mark in stale], workers)
+    return len(stale)
+
+
+def mark_stale(paths):
+    """
+    Queues the pages for re-rendering in the current transaction and removes their snapshots once it commits,
+    so anonymous visitors get the page rendered dynamically until the new snapshot is written.
+    """
+    paths = set(paths)
+    if not paths:
+        return
+    StaleSnapshot.objects.bulk_create([StaleSnapshot(path=path) for path in paths], ignore_conflicts=True)
+    transaction.on_commit(lambda: remove_snapshots(paths))
+
+
+def content_pages(contents):
+    """
+    Returns the paths of the pages showing the given content items: their own page, category pages and author profiles.
+
+    :param contents: Iterable of (content id, category ids, author id) tuples.
+    """
+    paths, category_ids, author_ids = set(), set(), set()
+    for content_id, content_category_ids, author_id in contents:
+        paths.add(content_path(content_id))
+        category_ids.update(content_category_ids)
+        author_ids.add(author_id)
+    names = Category.objects.filter(id__in=category_ids).values_list('name', flat=True)
+    return paths | {category_path(name) for name in names} | profile_pages(author_ids)
+
+
+def profile_pages(profile_ids):
+    user_ids = UserProfile.objects.filter(id__in=profile_ids).values_list('user_id', flat=True)
+    return {profile_path(user_id) for user_id in user_ids}
+
+
+def _content_categories(instance):
+    return {instance.category_id, getattr(instance, '_snapshot_category_id', None)} - {None}
+
+
+@receiver(post_init, sender=UserContent)
+def remember_content_category(sender, instance, **kwargs):
+    # The category the item was loaded with, so moving it to another category updates both category pages.
+    instance._snapshot_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_init, sender=Category)
+def remember_category_name(sender, instance, **kwargs):
+    instance._snapshot_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=UserContent)
+@receiver(post_delete, sender=UserContent)
+def content_changed(sender, instance, **kwargs):
+    mark_stale(content_pages([(instance.id, _content_categories(instance), instance.author_id)]))
+    instance._snapshot_category_id = instance.category_id
+
+
+@receiver(content_soft_deleted, sender=UserContent)
+def content_deleted(sender, ids, **kwargs):
+    contents = UserContent.all_objects.filter(id__in=ids).values_list('id', 'category_id', 'author_id')
+    mark_stale(content_pages((content_id, {category_id}, author_id) for content_id, category_id, author_id in contents))
+
+
+@receiver(content_batch_saved, sender=UserContent)
+def content_batch_changed(sender, created, updated, **kwargs):
+    mark_stale(content_pages((instance.id, _content_categories(instance), instance.author_id)
+                             for instance in created + updated))
+
+
+@receiver(m2m_changed, sender=UserContent.interests.through)
+def content_interests_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        content_ids = (pk_set or ()) if reverse else [instance.pk]
+        mark_stale(content_path(content_id) for content_id in content_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    mark_stale([content_path(instance.commented_content_id)])
+
+
+@receiver(post_save, sender=RatingVote)
+@receiver(post_delete, sender=RatingVote)
+def vote_changed(sender, instance, **kwargs):
+    mark_stale([content_path(instance.content_id)])
+
+
+@receiver(post_save, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    mark_stale([profile_path(instance.user_id)])
+
+
+@receiver(m2m_changed, sender=UserProfile.interests.through)
+def profile_interests_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        mark_stale(profile_pages(pk_set or ()) if reverse else [profile_path(instance.user_id)])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields == frozenset(['last_login']):
+        return
+    content_ids = UserContent.objects.filter(author__user=instance).values_list('id', flat=True)
+    mark_stale([profile_path(instance.id), *(content_path(content_id) for content_id in content_ids)])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    mark_stale(profile_pages([instance.author_id]))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    paths = {category_path(name) for name in (instance.name, instance._snapshot_name) if name}
+    if instance._snapshot_name not in (None, instance.name):
+        paths.update(content_path(content_id) for content_id in instance.usercontent_set.values_list('id', flat=True))
+    mark_stale(paths)
+    instance._snapshot_name = instance.name
+
+
+@receiver(post_save, sender=Interest)
+def interest_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    content_ids = UserContent.objects.filter(interests=instance).values_list('id', flat=True)
+    profile_ids = UserProfile.objects.filter(interests=instance).values_list('id', flat=True)
+    mark_stale([*(content_path(content_id) for content_id in content_ids), *profile_pages(profile_ids)])
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+from django.conf import settings
+
+ModuleTiming = namedtuple('ModuleTiming', ['module', 'self_us', 'cumulative_us', 'depth'])
+
+# Executed in a fresh interpreter started with -X importtime, so every import is measured from a cold start.
+PROFILED_STARTUP = '''
+import json, os, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {settings_module!r})
+phases = {{}}
+start = time.perf_counter()
+import django
+django.setup()
+phases['django.setup'] = time.perf_counter() - start
+start = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+phases['wsgi application'] = time.perf_counter() - start
+from culturalhub_app.warmup import warm_up
+for name, (seconds, result) in warm_up({steps!r}).items():
+    phases['warm-up: ' + name] = seconds
+print(json.dumps(phases))
+'''
+
+
+def parse_importtime(output):
+    """
+    Parses the report written to stderr by python -X importtime.
+
+    :return: List of ModuleTiming in import order.
+    """
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip()
+        depth = (len(name) - len(module) - 1) // 2
+        timings.append(ModuleTiming(module, int(fields[0]), int(fields[1]), depth))
+    return timings
+
+
+def group_by_package(timings):
+    """
+    Sums the self time of the modules per top-level package, in microseconds.
+    """
+    packages = {}
+    for timing in timings:
+        package = timing.module.split('.')[0]
+        packages[package] = packages.get(package, 0) + timing.self_us
+    return packages
+
+
+def profile_startup(steps=None):
+    """
+    Starts the application in a new interpreter and measures its cold start.
+
+    :param steps: Names of the warm-up steps to run after the application is loaded, all of them by default.
+    :return: Tuple of (list of ModuleTiming, dict mapping the initialization phases to seconds).
+    """
+    code = PROFILED_STARTUP.format(settings_module=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE),
+                                   steps=steps)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=settings.BASE_DIR,
+                             capture_output=True, text=True, check=True)
+    phases = json.loads(process.stdout.strip().splitlines()[-1])
+    return parse_importtime(process.stderr), phases
@@ -0,0 +1,64 @@
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+
+from culturalhub_app.compression import COMPRESSIBLE_EXTENSIONS, ENCODINGS, compress
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage fingerprinting files into a manifest and writing precompressed
+    variants (.gz, and .br when the brotli package is installed) during collectstatic.
+    """
+    def post_process(self, paths, dry_run=False, **options):
+        """
+        Runs the fingerprinting of ManifestStaticFilesStorage, then compresses the collected files.
+        """
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self.write_compressed(name)
+
+    def write_compressed(self, name):
+        """
+        Writes the compressed variants of a collected file, unless it is too small to benefit from it.
+        """
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < settings.COMPRESSION_MIN_SIZE:
+            return
+
+        for encoding, suffix in ENCODINGS.items():
+            compressed = compress(data, encoding, best=True)
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def url(self, name, force=False):
+        """
+        Falls back to the unhashed URL when the file is missing from the manifest (e.g. collectstatic
+        has not been run in a development or test environment) instead of failing the whole page.
+        """
+        try:
+            return super().url(name, force)
+        except ValueError:
+            logger.warning('Static file %s is missing from the manifest, run collectstatic.', name)
+            return StaticFilesStorage.url(self, name)
+
+    def is_fingerprinted(self, name):
+        """
+        Checks if a name is the hashed name of a collected file, which can be cached forever.
+        """
+        if not hasattr(self, '_fingerprinted_names'):
+            self._fingerprinted_names = set(self.hashed_files.values()) - set(self.hashed_files)
+        return name in self._fingerprinted_names
@@ -0,0 +1,31 @@
+import hashlib
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage naming files after the SHA-256 digest of their content.
+    Storing a file which already exists returns the name of the existing file instead of writing a copy,
+    so the same image uploaded many times takes the disk space of one.
+    """
+    def save(self, name, content, max_length=None):
+        """
+        Hashes the uploaded file chunk by chunk (uploads are kept in temporary files, never fully in memory)
+        and stores it as <upload_to>/<first two digest characters>/<digest><extension>.
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+image_storage = ContentAddressedStorage()
@@ -7,6 +7,14 @@ from culturalhub_app.forms import RegistrationForm
 from culturalhub_app.models import UserProfile, Category, UserContent
 
 
+@pytest.fixture(autouse=True)
+def page_view_flush_interval(settings):
+    """
+    Keeps the background thread of pageviews from flushing buffered views in the middle of other tests.
+    """
+    settings.PAGE_VIEW_FLUSH_SECONDS = 3600
+
+
 @pytest.fixture
 def client():
     return Client()
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+from django.urls import reverse
+
+from culturalhub_app import autocomplete
+from culturalhub_app.autocomplete import PrefixIndex, CONTENT, USER, CATEGORY
+from culturalhub_app.models import UserContent, Comment, content_batch_saved
+
+
+@pytest.fixture
+def fresh_index():
+    autocomplete._index = None
+    yield
+    autocomplete._index = None
+
+
+def test_prefix_index_orders_by_popularity():
+    index = PrefixIndex()
+    index.build([(CONTENT, 1, 'Jazz night', 3), (CONTENT, 2, 'Jazz festival', 10),
+                 (USER, 1, 'jazzfan', 5), (CATEGORY, 1, 'Music', 7)])
+
+    assert [label for _, _, label, _ in index.search('JAZ')] == ['Jazz festival', 'jazzfan', 'Jazz night']
+    assert [label for _, _, label, _ in index.search('jazz', limit=1)] == ['Jazz festival']
+    assert index.search('opera') == []
+
+
+def test_prefix_index_incremental_updates():
+    index = PrefixIndex()
+    index.build([(CONTENT, 1, 'Opera gala', 1)])
+
+    index.upsert(CONTENT, 2, 'Open air cinema')
+    index.add_score(CONTENT, 2, 5)
+    assert [pk for _, pk, _, _ in index.search('op')] == [2, 1]
+
+    index.upsert(CONTENT, 1, 'Ballet gala')
+    assert [pk for _, pk, _, _ in index.search('op')] == [2]
+    assert index.search('ballet')[0][3] == 1
+
+    index.remove(CONTENT, 2)
+    assert index.search('op') == []
+    assert len(index) == 1
+
+
+def test_prefix_index_caches_large_ranges(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'SCAN_LIMIT', 2)
+    index = PrefixIndex()
+    index.build([(CONTENT, pk, f'Item {pk}', pk) for pk in range(5)])
+
+    assert [pk for _, pk, _, _ in index.search('item', limit=2)] == [4, 3]
+    index.add_score(CONTENT, 0, 100)
+    assert [pk for _, pk, _, _ in index.search('item', limit=2)] == [0, 4]
+
+
+def test_prefix_index_keeps_top_entries_of_broad_prefixes(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'SCAN_LIMIT', 2)
+    monkeypatch.setattr(autocomplete, 'MAX_RESULTS', 2)
+    index = PrefixIndex()
+    index.build([(CONTENT, pk, label, pk) for pk, label in enumerate(['ab', 'abc', 'Abd', 'ac', 'b', 'a'])])
+    assert index._top['a'] == [(5, CONTENT, 5, 'a'), (3, CONTENT, 3, 'ac')]
+
+    index.remove(CONTENT, 3)
+    assert 'a' not in index._top
+    index.upsert(CONTENT, 6, 'abe', 10)
+    assert [label for _, _, label, _ in index.search('a', limit=5)] == ['abe', 'a']
+    index.upsert(CONTENT, 2, 'b2')
+    assert [label for _, _, label, _ in index.search('ab')] == ['abe', 'abc']
+    assert [label for _, _, label, _ in index.search('b')] == ['b', 'b2']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_index_is_rebuilt_in_background(settings, fresh_index, create_test_category_with_content):
+    content1, content2 = create_test_category_with_content
+    index = autocomplete.get_index()
+    # Written by another worker: this one only sees it after a rebuild.
+    UserContent.objects.bulk_create([UserContent(title='contest', category=content1.category, author=content1.author)])
+    settings.AUTOCOMPLETE_REBUILD_SECONDS = 0
+
+    assert autocomplete.get_index() is index
+    deadline = time.monotonic() + 5
+    while autocomplete.get_index() is index and time.monotonic() < deadline:
+        time.sleep(0.01)
+    settings.AUTOCOMPLETE_REBUILD_SECONDS = 600
+    # Each stale lookup may have started another rebuild, which must not query the database during teardown.
+    for thread in threading.enumerate():
+        if thread.name == 'autocomplete-rebuild':
+            thread.join()
+    assert [label for _, _, label, _ in autocomplete.get_index().search('contes')] == ['contest']
+
+
+@pytest.mark.django_db
+def test_changes_during_rebuild_are_replayed(fresh_index, create_test_category_with_content):
+    content1, content2 = create_test_category_with_content
+    index = autocomplete.get_index()
+    autocomplete._pending_updates = []
+    content2.title = 'renamed'
+    content2.save()
+    assert index.search('renamed')
+    UserContent.objects.filter(id=content2.id).update(title='content2')
+
+    autocomplete._rebuild()
+    assert autocomplete.get_index() is not index
+    assert [pk for _, pk, _, _ in autocomplete.get_index().search('renamed')] == [content2.id]
+    assert autocomplete._pending_updates is None
+
+
+@pytest.mark.django_db
+def test_batch_changes_during_rebuild_are_replayed(fresh_index, create_test_category_with_content):
+    contents = create_test_category_with_content
+    autocomplete.get_index()
+    autocomplete._pending_updates = []
+    for content in contents:
+        content.title = f'batch {content.id}'
+    content_batch_saved.send(sender=UserContent, created=[], updated=list(contents))
+
+    autocomplete._rebuild()
+    assert sorted(pk for _, pk, _, _ in autocomplete.get_index().search('batch')) == [content.id for content in contents]
+
+
+@pytest.mark.django_db
+def test_autocomplete_view(client, fresh_index, create_test_category_with_content, create_user_profile):
+    content1, content2 = create_test_category_with_content
+    Comment.objects.create(user=create_user_profile, commented_content=content2, text='Great!')
+
+    response = client.get(reverse('autocomplete'), {'query': 'cont'})
+    assert response.status_code == 200
+    assert [result['id'] for result in response.json()['results']] == [content2.id, content1.id]
+
+    content3 = UserContent.objects.create(title='contest', category=content1.category, author=create_user_profile)
+    response = client.get(reverse('autocomplete'), {'query': 'contes'})
+    assert response.json()['results'] == [{
+        'type': 'content', 'id': content3.id, 'label': 'contest',
+        'url': reverse('content-view', kwargs={'content_id': content3.id}),
+    }]
+
+    for limit in (0, -5):
+        response = client.get(reverse('autocomplete'), {'query': 'cont', 'limit': limit})
+        assert [result['id'] for result in response.json()['results']] == [content2.id]
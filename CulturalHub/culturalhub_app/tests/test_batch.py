@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from culturalhub_app.batch import save_content_batch
+from culturalhub_app.models import UserContent, Interest, FeedEvent
+
+
+@pytest.fixture
+def interests():
+    return [Interest.objects.create(name=name) for name in ('Opera', 'Jazz', 'Theatre')]
+
+
+def make_items(category, interests, count):
+    return [
+        {'title': f'Event {i}', 'description': 'Batch', 'category': category.id, 'culture': 'Polish',
+         'interests': [interest.id for interest in interests[:i % 3 + 1]]}
+        for i in range(count)
+    ]
+
+
+def post_batch(client, items):
+    return client.post(reverse('content-batch'), json.dumps({'items': items}), content_type='application/json')
+
+
+@pytest.mark.django_db
+def test_batch_creates_and_updates(client, create_test_category_with_content, create_test_category, interests):
+    content = create_test_category_with_content[0]
+    UserContent.objects.filter(id=content.id).update(description='Existing', culture='Polish')
+    content.interests.add(interests[0])
+    client.force_login(content.author.user)
+    items = make_items(create_test_category, interests, 3) + [{'id': content.id, 'title': 'Renamed',
+                                                                'interests': [interests[2].id]}]
+    response = post_batch(client, items)
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [result['status'] for result in results] == ['created', 'created', 'created', 'updated']
+
+    created = UserContent.objects.get(id=results[1]['id'])
+    assert created.author == content.author and created.created_at is not None
+    assert set(created.interests.all()) == set(interests[:2])
+    assert FeedEvent.objects.filter(content=created).exists()
+
+    content.refresh_from_db()
+    assert content.title == 'Renamed' and content.category == create_test_category
+    assert list(content.interests.all()) == [interests[2]]
+
+
+@pytest.mark.django_db
+def test_batch_is_all_or_nothing(client, create_test_category_with_content, create_test_category, interests):
+    content = create_test_category_with_content[0]
+    stranger = User.objects.create_user(username='stranger', password='testpassword')
+    other = UserContent.objects.create(title='other', category=create_test_category, author=stranger.userprofile)
+    client.force_login(content.author.user)
+
+    items = make_items(create_test_category, interests, 2)
+    items += [{'title': 'No category', 'description': 'x', 'culture': 'x', 'interests': [interests[0].id]},
+              {'id': other.id, 'title': 'Hijacked'}, {**items[0], 'interests': [999]}]
+    response = post_batch(client, items)
+    assert response.status_code == 400
+    results = response.json()['results']
+    assert 'errors' not in results[0] and 'errors' not in results[1]
+    assert list(results[2]['errors']) == ['category']
+    assert list(results[3]['errors']) == ['id']
+    assert list(results[4]['errors']) == ['interests']
+    assert UserContent.objects.count() == 3
+    assert UserContent.objects.get(id=other.id).title == 'other'
+
+
+@pytest.mark.django_db
+def test_batch_query_count_is_constant(create_user_profile, create_test_category, interests):
+    def count_queries(items):
+        with CaptureQueriesContext(connection) as queries:
+            saved, _ = save_content_batch(create_user_profile, items)
+        assert saved
+        return len(queries)
+
+    small = count_queries(make_items(create_test_category, interests, 2))
+    assert count_queries(make_items(create_test_category, interests, 40)) == small
+    assert UserContent.objects.count() == 42
+
+
+@pytest.mark.django_db
+def test_batch_rejects_malformed_requests(client, create_user_profile):
+    client.force_login(create_user_profile.user)
+    assert client.post(reverse('content-batch'), 'not json', content_type='application/json').status_code == 400
+    assert post_batch(client, []).status_code == 400
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from culturalhub_app import cache as two_tier
+
+
+@pytest.fixture
+def workers(settings):
+    """
+    Returns a function creating the default cache of a new worker process, with its own local tier
+    in front of a local memory stand-in for the shared tier.
+    """
+    settings.CACHES = {
+        'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'two-tier-test'},
+    }
+    caches['shared'].clear()
+
+    def create_worker(**options):
+        two_tier._local_tiers.clear()
+        options.setdefault('INVALIDATION_POLL_SECONDS', 0)
+        return two_tier.TwoTierCache('shared', {'TIMEOUT': 300, 'OPTIONS': options})
+
+    yield create_worker
+    two_tier._local_tiers.clear()
+
+
+def test_reads_are_served_locally_after_the_first(workers):
+    worker, other = workers(), workers()
+    worker.set('key', {'value': 1})
+    assert other.get('key') == {'value': 1}
+    assert other.get('key') == {'value': 1}
+    assert other.get('missing', 'default') == 'default'
+
+    stats = other.get_stats()
+    assert (stats['local_hits'], stats['local_misses']) == (1, 2)
+    assert (stats['shared_hits'], stats['shared_misses']) == (1, 1)
+
+
+def test_writes_invalidate_the_other_workers(workers):
+    worker, other = workers(), workers()
+    worker.set_many({'a': 1, 'b': 2})
+    assert other.get_many(['a', 'b', 'c']) == {'a': 1, 'b': 2}
+
+    worker.set('a', 10)
+    worker.delete('b')
+    assert other.get_many(['a', 'b']) == {'a': 10}
+    assert other.get_stats()['invalidations'] == 2
+    # A worker doesn't drop the values it wrote itself.
+    assert worker.get('a') == 10
+    assert worker.get_stats()['local_hits'] == 1
+
+    worker.set('counter', 1)
+    assert other.get('counter') == 1
+    assert worker.incr('counter', 5) == 6
+    assert other.get('counter') == 6
+
+
+def test_missed_messages_drop_the_local_tier(workers):
+    worker, other = workers(), workers(INVALIDATION_MESSAGE_TIMEOUT=60)
+    worker.set('a', 1)
+    other.get('a')
+    worker.set('a', 2)
+    caches['shared'].delete(two_tier.INVALIDATION_MESSAGE_KEY % 2)
+    assert other.get('a') == 2
+    assert other.get_stats()['local_clears'] == 1
+
+    worker.clear()
+    assert other.get('a') is None
+
+
+def test_local_tier_is_bounded(workers):
+    worker = workers(MAX_ENTRIES=2, LOCAL_MAX_BYTES=1000, LOCAL_TIMEOUT=0.05)
+    worker.set('a', 1)
+    worker.set('b', 2)
+    worker.get('a')
+    worker.set('c', 3)
+    worker.set('big', 'x' * 2000)
+    stats = worker.get_stats()
+    assert stats['local_entries'] == 2 and stats['local_evictions'] == 1
+    assert worker.get('a') == 1 and worker.get('b') == 2 and worker.get('big') == 'x' * 2000
+    assert worker.get_stats()['shared_hits'] == 2
+
+    worker.reset_stats()
+    time.sleep(0.05)
+    assert worker.get('a') == 1
+    assert worker.get_stats()['shared_hits'] == 1
+
+
+def test_shared_tier_needs_atomic_incr(workers, settings, tmp_path):
+    worker = workers()
+    settings.CACHES = {
+        'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tmp_path},
+    }
+    with pytest.raises(ImproperlyConfigured):
+        worker.set('key', 1)
@@ -0,0 +1,114 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from culturalhub_app.models import Comment, encode_path_segment, path_upper_bound
+
+
+@pytest.fixture
+def content(create_test_category_with_content):
+    return create_test_category_with_content[0]
+
+
+@pytest.fixture
+def thread(create_user_profile, content):
+    """
+    Two threads: first with replies a, b (a has reply a1), second without replies.
+    """
+    def comment(text, parent=None):
+        return Comment.objects.create(user=create_user_profile, commented_content=content, text=text, parent=parent)
+
+    first = comment('first')
+    a = comment('a', first)
+    b = comment('b', first)
+    a1 = comment('a1', a)
+    second = comment('second')
+    return first, a, b, a1, second
+
+
+def test_path_segments_keep_numeric_order():
+    assert encode_path_segment(35) == '0000000z'
+    assert encode_path_segment(36) == '00000010'
+    assert encode_path_segment(9) < encode_path_segment(10) < encode_path_segment(36)
+    assert path_upper_bound('00000001' + '0000000z') == '00000001' + '00000010'
+
+
+@pytest.mark.django_db
+def test_comment_paths_and_counts(thread):
+    first, a, b, a1, second = thread
+    a1.refresh_from_db()
+    first.refresh_from_db()
+    assert a1.path == first.path + encode_path_segment(a.id) + encode_path_segment(a1.id)
+    assert a1.depth == 2
+    assert first.reply_count == 2
+
+
+@pytest.mark.django_db
+def test_subtree_is_depth_first(thread, django_assert_num_queries):
+    first, a, b, a1, second = thread
+    with django_assert_num_queries(1):
+        texts = [comment.text for comment in Comment.objects.subtree(first)]
+    assert texts == ['first', 'a', 'a1', 'b']
+
+
+@pytest.mark.django_db
+def test_threads_limit_replies_per_thread(thread, content):
+    roots = list(Comment.objects.roots(content))
+    texts = [comment.text for comment in Comment.objects.threads(roots, max_depth=1, replies_per_thread=1)]
+    assert texts == ['first', 'a', 'second']
+
+
+@pytest.mark.django_db
+def test_content_view_collapses_replies(client, thread, content):
+    response = client.get(reverse('content-view', kwargs={'content_id': content.id}))
+    comments = response.context['comments']
+    assert [comment.text for comment in comments] == ['first', 'a', 'b', 'second']
+    assert [comment.hidden_replies for comment in comments] == [0, 1, 0, 0]
+
+
+@pytest.mark.django_db
+def test_add_reply(client, thread, content, create_user_profile):
+    first = thread[0]
+    client.force_login(create_user_profile.user)
+    response = client.post(reverse('add-comment', kwargs={'content_id': content.id}),
+                           {'text': 'reply', 'parent': first.id})
+    assert response.status_code == 302
+    assert response.url == reverse('comment-thread', kwargs={'comment_id': first.id})
+
+    response = client.get(response.url)
+    assert [comment.text for comment in response.context['comments_page']] == ['first', 'a', 'a1', 'b', 'reply']
+
+
+@pytest.mark.django_db
+def test_add_reply_rejects_invalid_parent(client, thread, content, create_user_profile):
+    client.force_login(create_user_profile.user)
+    url = reverse('add-comment', kwargs={'content_id': content.id})
+    assert client.post(url, {'text': 'reply', 'parent': 'x'}).status_code == 400
+    assert client.post(url, {'text': 'reply', 'parent': thread[-1].id + 100}).status_code == 404
+    assert Comment.objects.count() == len(thread)
+
+
+@pytest.mark.django_db
+def test_saving_a_comment_keeps_reply_count(thread):
+    first = Comment.objects.get(id=thread[0].id)
+    Comment.objects.create(user=first.user, commented_content=first.commented_content, text='late', parent=first)
+    first.text = 'edited'
+    first.save()
+    first.refresh_from_db()
+    assert (first.text, first.reply_count) == ('edited', 3)
+
+
+@pytest.mark.django_db
+def test_comments_without_path_are_backfilled(client, thread, content):
+    paths = dict(Comment.objects.values_list('id', 'path'))
+    Comment.objects.update(path='', depth=0)
+    response = client.get(reverse('content-view', kwargs={'content_id': content.id}))
+    assert response.status_code == 200 and not response.context['comments']
+    first = Comment.objects.get(id=thread[0].id)
+    assert list(Comment.objects.subtree(first)) == [first]
+
+    call_command('backfill_comment_paths', batch_size=2)
+    assert dict(Comment.objects.values_list('id', 'path')) == paths
+    assert Comment.objects.get(id=thread[3].id).depth == 2
+    response = client.get(reverse('content-view', kwargs={'content_id': content.id}))
+    assert [comment.text for comment in response.context['comments']] == ['first', 'a', 'b', 'second']
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from culturalhub_app import db_router
+from culturalhub_app.db_router import PrimaryReplicaRouter
+from culturalhub_app.middleware import ReplicaRoutingMiddleware, PRIMARY_PIN_COOKIE
+from culturalhub_app.models import UserContent
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+    db_router.reset_routing_stats()
+    return settings.DATABASE_REPLICAS
+
+
+def routed_middleware():
+    """
+    Returns a middleware whose view reports the alias used for reads of the request.
+    """
+    return ReplicaRoutingMiddleware(
+        lambda request: HttpResponse(PrimaryReplicaRouter().db_for_read(UserContent))
+    )
+
+
+def test_router_without_request_reads_from_primary(replicas):
+    assert PrimaryReplicaRouter().db_for_read(UserContent) == 'default'
+
+
+def test_get_request_reads_from_replica(replicas):
+    response = routed_middleware()(RequestFactory().get('/main/'))
+    assert response.content == b'replica'
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+    assert db_router.get_routing_stats() == {'replica': 1}
+
+
+def test_post_request_pins_user_to_primary(replicas):
+    middleware = routed_middleware()
+    response = middleware(RequestFactory().post('/content/create/'))
+    assert response.content == b'default'
+    assert PRIMARY_PIN_COOKIE in response.cookies
+
+    request = RequestFactory().get('/main/')
+    request.COOKIES[PRIMARY_PIN_COOKIE] = response.cookies[PRIMARY_PIN_COOKIE].value
+    assert middleware(request).content == b'default'
+    assert db_router.get_routing_stats() == {'default': 2}
+
+
+def test_expired_pin_reads_from_replica(replicas):
+    request = RequestFactory().get('/main/')
+    request.COOKIES[PRIMARY_PIN_COOKIE] = str(time.time() - 1)
+    assert routed_middleware()(request).content == b'replica'
+
+
+def test_write_during_request_pins_remaining_reads(replicas):
+    router = PrimaryReplicaRouter()
+
+    def view(request):
+        before = router.db_for_read(UserContent)
+        router.db_for_write(UserContent)
+        return HttpResponse(f'{before},{router.db_for_read(UserContent)}')
+
+    response = ReplicaRoutingMiddleware(view)(RequestFactory().get('/main/'))
+    assert response.content == b'replica,default'
@@ -0,0 +1,98 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from culturalhub_app.duplicates import (PERMUTATIONS, minhash, similarity, find_duplicates, cluster_duplicates,
+                                        duplicates_of_oldest, pack, bucket_keys)
+from culturalhub_app.models import UserContent, ContentSignature, ContentBucket, Interest
+
+DESCRIPTION = ('Join us for an evening of traditional folk music in the old town square. Local bands will play '
+               'songs from the region, followed by a dance workshop for beginners and a tasting of regional dishes.')
+
+
+@pytest.fixture
+def concert(create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    content.title = 'Folk music evening'
+    content.description = DESCRIPTION
+    content.save()
+    return content
+
+
+def test_signatures_estimate_similarity():
+    signature = minhash(DESCRIPTION)
+    assert similarity(signature, minhash(DESCRIPTION.replace('evening', 'night'))) > 0.7
+    assert similarity(signature, minhash('A lecture on medieval painting techniques at the city museum.')) < 0.1
+    assert minhash(' !? ') is None
+
+
+@pytest.mark.django_db
+def test_similar_content_is_found(concert, create_test_category_with_content):
+    copy = UserContent(title='Folk music evening!', description=DESCRIPTION + ' Free entry.')
+    assert [content for content, _ in find_duplicates(copy)] == [concert]
+    assert find_duplicates(UserContent(title='Jazz', description='A jazz concert by the river.')) == []
+
+    UserContent.objects.filter(id=concert.id).soft_delete()
+    assert find_duplicates(copy) == []
+
+
+@pytest.mark.django_db
+def test_creation_warns_or_blocks(client, settings, concert):
+    client.force_login(concert.author.user)
+    data = {'title': 'Folk music evening', 'description': DESCRIPTION, 'culture': 'Polish',
+            'category': concert.category_id, 'interests': [Interest.objects.create(name='Music').id]}
+
+    response = client.post(reverse('create-content'), data)
+    assert response.status_code == 200
+    assert response.context['duplicates'][0][0] == concert
+    assert UserContent.objects.count() == 2
+
+    settings.DUPLICATE_ACTION = 'block'
+    response = client.post(reverse('create-content'), {**data, 'confirm_duplicate': '1'})
+    assert response.status_code == 200
+    assert UserContent.objects.count() == 2
+
+    settings.DUPLICATE_ACTION = 'warn'
+    assert client.post(reverse('create-content'), {**data, 'confirm_duplicate': '1'}).status_code == 302
+    assert UserContent.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_existing_duplicates_are_clustered(concert, create_test_category_with_content):
+    copies = [UserContent.objects.create(title=f'Folk music evening {i}', description=DESCRIPTION,
+                                         category=concert.category, author=concert.author) for i in range(2)]
+    other = create_test_category_with_content[1]
+    # Items created before duplicates were indexed.
+    ContentSignature.objects.all().delete()
+    UserContent.objects.filter(id=copies[1].id).update(description=DESCRIPTION.upper().replace(',', ''))
+
+    call_command('cluster_duplicates')
+    assert cluster_duplicates(100) == [[concert.id, copies[0].id, copies[1].id]]
+
+    call_command('cluster_duplicates', soft_delete=True)
+    assert list(UserContent.objects.order_by('id')) == [concert, other]
+
+
+@pytest.mark.django_db
+def test_only_duplicates_of_the_oldest_item_are_deleted(settings, concert):
+    settings.DUPLICATE_SIMILARITY_THRESHOLD = 0.8
+    copies = [UserContent.objects.create(title=f'Copy {i}', description=DESCRIPTION, category=concert.category,
+                                         author=concert.author) for i in range(2)]
+    # A chain: each item is similar to the next one, but the last differs too much from the first.
+    contents = [concert, *copies]
+    signatures = [(1,) * (PERMUTATIONS - changed) + (2,) * changed for changed in (0, 15, 30)]
+    ContentSignature.objects.all().delete()
+    ContentBucket.objects.all().delete()
+    ContentSignature.objects.bulk_create(ContentSignature(content=content, signature=pack(signature))
+                                         for content, signature in zip(contents, signatures))
+    ContentBucket.objects.bulk_create(ContentBucket(content=content, key=key) for content, signature
+                                      in zip(contents, signatures) for key in bucket_keys(signature))
+
+    clusters = cluster_duplicates(100)
+    assert clusters == [[concert.id, copies[0].id, copies[1].id]]
+    assert duplicates_of_oldest(clusters, 1) == [copies[0].id]
+
+    call_command('cluster_duplicates', soft_delete=True)
+    assert list(UserContent.objects.filter(id__in=[content.id for content in contents]).order_by('id')) == [
+        concert, copies[1]
+    ]
@@ -0,0 +1,160 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from culturalhub_app.feed import get_feed, feed_cursor, process_feed_events, recount_interested_profiles
+from culturalhub_app.models import UserProfile, Interest, UserContent, Comment, Follow, FeedEvent, FeedItem
+
+
+@pytest.fixture
+def author(create_user_profile):
+    return create_user_profile
+
+
+@pytest.fixture
+def reader():
+    return User.objects.create_user(username='reader', password='testpassword').userprofile
+
+
+def add_content(author, category, title, interests=()):
+    content = UserContent.objects.create(title=title, category=category, author=author)
+    content.interests.set(interests)
+    return content
+
+
+@pytest.mark.django_db
+def test_content_is_fanned_out_to_followers_and_interests(client, author, reader, create_test_category):
+    client.force_login(reader.user)
+    client.post(reverse('follow', kwargs={'user_id': author.user.id}))
+    jazz = Interest.objects.create(name='Jazz')
+    fan = User.objects.create_user(username='fan', password='testpassword').userprofile
+    fan.interests.add(jazz)
+
+    content = add_content(author, create_test_category, 'Jazz night', [jazz])
+    assert FeedEvent.objects.count() == 1
+    assert process_feed_events() == 1
+    assert not FeedEvent.objects.exists()
+
+    assert [(item.content, item.reason) for item in get_feed(reader)] == [(content, FeedItem.FOLLOWED_AUTHOR)]
+    assert [(item.content, item.reason) for item in get_feed(fan)] == [(content, FeedItem.INTEREST)]
+    assert get_feed(author) == []
+
+    Comment.objects.create(user=reader, commented_content=content, text='See you there')
+    call_command('process_feed', verbosity=0)
+    assert [item.reason for item in get_feed(author)] == [FeedItem.COMMENT]
+
+
+@pytest.mark.django_db
+def test_feed_is_capped(settings, author, reader, create_test_category):
+    settings.FEED_MAX_ITEMS = 3
+    Follow.objects.create(follower=reader, author=author)
+    contents = [add_content(author, create_test_category, f'content{i}') for i in range(5)]
+    process_feed_events()
+
+    assert [item.content for item in get_feed(reader)] == contents[:1:-1]
+
+
+@pytest.mark.django_db
+def test_popular_authors_are_merged_on_read(settings, author, reader, create_test_category):
+    settings.FEED_FANOUT_LIMIT = 0
+    settings.FEED_PAGE_SIZE = 2
+    other = User.objects.create_user(username='other', password='testpassword').userprofile
+    Follow.objects.create(follower=reader, author=other)
+    Follow.objects.create(follower=reader, author=author)
+    Follow.objects.create(follower=other, author=author)
+    UserProfile.objects.filter(id=author.id).update(follower_count=2)
+
+    first = add_content(author, create_test_category, 'first')
+    Comment.objects.create(user=other, commented_content=first, text='Nice')
+    second = add_content(author, create_test_category, 'second')
+    process_feed_events()
+
+    assert FeedItem.objects.filter(owner=reader, comment=None).count() == 0
+    page = get_feed(reader)
+    assert [(item.content, item.comment is not None) for item in page] == [(second, False), (first, True)]
+    assert [item.content for item in get_feed(reader, before=feed_cursor(page[-1]))] == [first]
+
+
+@pytest.mark.django_db
+def test_popular_interests_are_merged_on_read(settings, author, reader, create_test_category):
+    settings.FEED_FANOUT_LIMIT = 1
+    jazz, blues = Interest.objects.create(name='Jazz'), Interest.objects.create(name='Blues')
+    fan = User.objects.create_user(username='fan', password='testpassword').userprofile
+    fan.interests.set([jazz, blues])
+    reader.interests.add(jazz)
+    assert Interest.objects.get(id=jazz.id).profile_count == 2
+
+    content = add_content(author, create_test_category, 'Jazz and blues', [jazz, blues])
+    process_feed_events()
+    assert not FeedItem.objects.exists()
+    assert [(item.content, item.reason) for item in get_feed(reader)] == [(content, FeedItem.INTEREST)]
+    assert [item.content for item in get_feed(fan)] == [content]
+    assert get_feed(author) == []
+
+    fan.interests.clear()
+    assert list(Interest.objects.order_by('id').values_list('profile_count', flat=True)) == [1, 0]
+
+
+@pytest.mark.django_db
+def test_interest_counts_follow_deletions_and_are_recounted(reader):
+    jazz, blues = Interest.objects.create(name='Jazz'), Interest.objects.create(name='Blues')
+    fan = User.objects.create_user(username='fan', password='testpassword').userprofile
+    fan.interests.set([jazz, blues])
+    reader.interests.add(jazz)
+    fan.user.delete()
+    assert list(Interest.objects.order_by('id').values_list('profile_count', flat=True)) == [1, 0]
+
+    # Counts of interests chosen before they were maintained.
+    Interest.objects.update(profile_count=0)
+    call_command('recount_interests', verbosity=0)
+    assert list(Interest.objects.order_by('id').values_list('profile_count', flat=True)) == [1, 0]
+    assert recount_interested_profiles() == 0
+
+
+@pytest.mark.django_db
+def test_pages_split_items_of_equal_time(settings, author, reader, create_test_category):
+    settings.FEED_PAGE_SIZE = 2
+    Follow.objects.create(follower=reader, author=author)
+    contents = [add_content(author, create_test_category, f'content{i}') for i in range(5)]
+    UserContent.objects.update(created_at=contents[0].created_at)
+    process_feed_events()
+
+    seen, before = [], None
+    while page := get_feed(reader, before=before):
+        seen.extend(item.content for item in page)
+        before = feed_cursor(page[-1])
+    assert seen == contents[::-1]
+
+
+@pytest.mark.django_db
+def test_trim_only_touches_feeds_over_the_cap(settings, author, reader, create_test_category):
+    settings.FEED_MAX_ITEMS = 2
+    other = User.objects.create_user(username='other', password='testpassword').userprofile
+    Follow.objects.create(follower=reader, author=author)
+    Follow.objects.create(follower=other, author=author)
+    contents = [add_content(author, create_test_category, f'content{i}') for i in range(2)]
+    process_feed_events()
+    FeedItem.objects.filter(owner=other).delete()
+    contents.append(add_content(author, create_test_category, 'content2'))
+    process_feed_events()
+
+    assert [item.content for item in get_feed(reader)] == contents[:0:-1]
+    assert [item.content for item in get_feed(other)] == contents[2:]
+
+
+@pytest.mark.django_db
+def test_follow_view_toggles(client, author, reader):
+    client.force_login(reader.user)
+    client.post(reverse('follow', kwargs={'user_id': author.user.id}))
+    author.refresh_from_db()
+    assert author.follower_count == 1
+
+    client.post(reverse('follow', kwargs={'user_id': author.user.id}))
+    author.refresh_from_db()
+    assert author.follower_count == 0
+    assert not Follow.objects.exists()
+
+    response = client.get(reverse('feed'), {'before': 'not-a-cursor'})
+    assert response.status_code == 200
+    assert list(response.context['items']) == []
@@ -0,0 +1,71 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from culturalhub_app import identity_map
+from culturalhub_app.models import UserContent, UserProfile, Comment
+
+
+def count_queries(table, callback):
+    with CaptureQueriesContext(connection) as queries:
+        callback()
+    return sum(f'"{table}"' in query['sql'].split('WHERE')[0] for query in queries)
+
+
+@pytest.mark.django_db
+def test_related_lookups_are_deduplicated(create_test_category_with_content, create_user_profile):
+    content = create_test_category_with_content[0]
+    for i in range(3):
+        Comment.objects.create(user=create_user_profile, commented_content=content, text=f'comment {i}')
+
+    def read_authors():
+        for comment in Comment.objects.all():
+            comment.user.user.username
+            comment.commented_content.category.name
+
+    assert count_queries('culturalhub_app_userprofile', read_authors) == 3
+    with identity_map.identity_map_scope() as objects:
+        assert count_queries('culturalhub_app_userprofile', read_authors) == 1
+    assert objects.hits == 4 and objects.misses == 4
+
+
+@pytest.mark.django_db
+def test_reverse_one_to_one_uses_the_map(create_test_category_with_content, create_user_profile):
+    with identity_map.identity_map_scope():
+        profile = UserContent.objects.get(id=create_test_category_with_content[0].id).author
+        user = User.objects.get(id=create_user_profile.user_id)
+        with CaptureQueriesContext(connection) as queries:
+            assert user.userprofile is profile
+        assert not queries
+
+
+@pytest.mark.django_db
+def test_requests_get_their_own_map(client, create_user_profile, create_test_category):
+    for i in range(5):
+        UserContent.objects.create(title=f'content{i}', category=create_test_category, author=create_user_profile)
+    identity_map.reset_identity_map_stats()
+
+    categories = count_queries('culturalhub_app_category', lambda: client.get(
+        reverse('user', kwargs={'user_id': create_user_profile.user_id})
+    ))
+    assert categories == 1
+    assert identity_map.get_identity_map_stats() == {'scopes': 1, 'hits': 4, 'misses': 2}
+    assert identity_map.get_identity_map() is None
+
+
+@pytest.mark.django_db
+def test_map_is_per_database_and_cleared_by_writes(create_test_category_with_content, create_user_profile):
+    content = create_test_category_with_content[0]
+    comments = [Comment.objects.create(user=create_user_profile, commented_content=content, text=f'comment {i}')
+                for i in range(3)]
+    with identity_map.identity_map_scope() as objects:
+        profile = Comment.objects.get(id=comments[0].id).user
+        assert objects.get(UserProfile, 'default', profile.id) is profile
+        assert objects.get(UserProfile, 'replica', profile.id) is None
+
+        UserProfile.objects.filter(id=profile.id).update(follower_count=5)
+        assert not objects.objects
+        assert Comment.objects.get(id=comments[1].id).user.follower_count == 5
+        assert Comment.objects.get(id=comments[2].id).user is not profile
@@ -0,0 +1,86 @@
+import io
+from concurrent.futures import Future
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image
+
+from culturalhub_app import images
+from culturalhub_app.images import thumbnail_name
+from culturalhub_app.storage import image_storage
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    settings.THUMBNAIL_WORKERS = 0
+    return tmp_path
+
+
+def make_image(name='photo.png', color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (800, 600), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def test_storage_deduplicates_by_content(media):
+    first = image_storage.save('avatars/a.png', make_image())
+    second = image_storage.save('avatars/b.PNG', make_image())
+    other = image_storage.save('avatars/c.png', make_image(color='blue'))
+
+    assert first == second
+    assert first != other
+    assert first.startswith('avatars/') and first.endswith('.png')
+    assert len(list((media / 'avatars').rglob('*.png'))) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_avatar_upload_renders_thumbnails(client, media, create_user_profile, settings):
+    user = create_user_profile.user
+    client.force_login(user)
+    response = client.post(reverse('edit-user', kwargs={'user_id': user.id}), {
+        'first_name': 'Test', 'last_name': 'User', 'country': 'US', 'birth_year': 1990, 'avatar': make_image(),
+    })
+    assert response.status_code == 302
+
+    create_user_profile.refresh_from_db()
+    name = create_user_profile.avatar.name
+    for size, dimensions in settings.THUMBNAIL_SIZES.items():
+        with Image.open(image_storage.path(thumbnail_name(name, size))) as thumbnail:
+            assert thumbnail.size == dimensions
+
+    response = client.get(reverse('image', kwargs={'size': 'avatar', 'name': name}))
+    assert response.status_code == 200
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+
+def test_image_view_falls_back_to_original(client, media):
+    name = image_storage.save('content/photo.png', make_image())
+
+    response = client.get(reverse('image', kwargs={'size': 'large', 'name': name}))
+    assert response['Cache-Control'] == 'public, max-age=60'
+    response = client.get(reverse('image', kwargs={'size': 'large', 'name': name}))
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    assert client.get(reverse('image', kwargs={'size': 'huge', 'name': name})).status_code == 404
+    assert client.get(reverse('image', kwargs={'size': 'large', 'name': 'content/missing.png'})).status_code == 404
+
+
+def test_missing_thumbnails_are_scheduled_once(client, media, settings, monkeypatch):
+    settings.THUMBNAIL_WORKERS = 1
+    submitted = []
+
+    class Pool:
+        def submit(self, *args):
+            submitted.append(Future())
+            return submitted[-1]
+
+    monkeypatch.setattr(images, 'get_pool', Pool)
+    name = image_storage.save('content/photo.png', make_image())
+    for _ in range(3):
+        assert client.get(reverse('image', kwargs={'size': 'large', 'name': name})).status_code == 200
+    assert len(submitted) == 1
+
+    submitted[0].set_result(None)
+    assert images.schedule_thumbnails(name) is submitted[1]
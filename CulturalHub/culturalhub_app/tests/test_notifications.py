@@ -0,0 +1,92 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+
+from culturalhub_app.models import Comment, CommentNotification
+from culturalhub_app.notifications import send_comment_digests
+
+
+@pytest.fixture
+def commenters():
+    return [User.objects.create_user(username=f'commenter{i}', email=f'commenter{i}@example.com',
+                                     password='testpassword').userprofile for i in range(2)]
+
+
+@pytest.fixture
+def author(create_user_profile):
+    create_user_profile.user.email = 'author@example.com'
+    create_user_profile.user.save()
+    return create_user_profile
+
+
+@pytest.mark.django_db
+def test_comments_queue_notifications(author, commenters, create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    first = Comment.objects.create(user=commenters[0], commented_content=content, text='Hello')
+    Comment.objects.create(user=commenters[1], commented_content=content, text='Hi', parent=first)
+    Comment.objects.create(user=author, commented_content=content, text='Thanks')
+
+    assert sorted(CommentNotification.objects.values_list('recipient__user__username', flat=True)) == [
+        'commenter0', 'testuser', 'testuser'
+    ]
+
+
+@pytest.mark.django_db
+def test_digests_are_sent_in_batches(settings, author, commenters, create_test_category_with_content):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.COMMENT_DIGEST_MAX_ITEMS = 2
+    content = create_test_category_with_content[0]
+    for i in range(3):
+        Comment.objects.create(user=commenters[0], commented_content=content, text=f'comment {i}')
+    reply_to = Comment.objects.create(user=author, commented_content=content, text='author comment')
+    Comment.objects.create(user=commenters[1], commented_content=content, text='reply', parent=reply_to)
+
+    assert send_comment_digests(batch_size=1) == 1
+    assert len(mail.outbox) == 1
+    digest = mail.outbox[0]
+    assert digest.to == ['author@example.com']
+    assert digest.subject == '4 new comments on CulturalHub'
+    assert 'comment 0' in digest.body and 'comment 2' not in digest.body
+    assert '...and 2 more.' in digest.body
+    assert not CommentNotification.objects.exists()
+
+    call_command('send_comment_digests', verbosity=0)
+    assert len(mail.outbox) == 1
+
+
+@pytest.mark.django_db
+def test_recipients_without_email_are_skipped(settings, create_user_profile, commenters,
+                                               create_test_category_with_content):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    Comment.objects.create(user=commenters[0], commented_content=create_test_category_with_content[0], text='Hi')
+
+    assert send_comment_digests() == 0
+    assert mail.outbox == []
+    assert not CommentNotification.objects.exists()
+
+
+@pytest.mark.django_db
+def test_digests_of_many_recipients_share_a_connection(settings, monkeypatch, create_test_category_with_content):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    content = create_test_category_with_content[0]
+    users = [User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='testpassword')
+             for i in range(5)]
+    for user in users:
+        Comment.objects.create(user=user.userprofile, commented_content=content, text=f'by {user.username}')
+        Comment.objects.create(user=content.author, commented_content=content, text='reply',
+                               parent=Comment.objects.filter(user=user.userprofile).first())
+
+    connections = []
+    send_messages = locmem.EmailBackend.send_messages
+
+    def send_or_fail(self, messages):
+        connections.append(self)
+        return 0 if messages[0].to == ['user3@example.com'] else send_messages(self, messages)
+
+    monkeypatch.setattr(locmem.EmailBackend, 'send_messages', send_or_fail)
+    assert send_comment_digests(batch_size=2) == 4
+    assert sorted(message.to[0] for message in mail.outbox) == [f'user{i}@example.com' for i in (0, 1, 2, 4)]
+    assert len(set(map(id, connections))) == 1
+    assert list(CommentNotification.objects.values_list('recipient__user__username', flat=True)) == ['user3']
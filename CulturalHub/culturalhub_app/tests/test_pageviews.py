@@ -0,0 +1,83 @@
+import time
+
+import pytest
+from django.urls import reverse
+
+from culturalhub_app import pageviews
+from culturalhub_app.models import UserContent, UserProfile
+
+
+@pytest.fixture
+def view_buffer(settings):
+    settings.PAGE_VIEW_FLUSH_SECONDS = 3600
+    settings.PAGE_VIEW_FLUSH_THRESHOLD = 1000
+    pageviews.reset_pending_views()
+    yield
+    pageviews.reset_pending_views()
+
+
+@pytest.mark.django_db
+def test_views_are_buffered_until_flushed(client, view_buffer, create_test_category_with_content, create_user_profile):
+    content, other = create_test_category_with_content
+    for _ in range(3):
+        client.get(reverse('content-view', kwargs={'content_id': content.id}))
+    client.get(reverse('user', kwargs={'user_id': create_user_profile.user_id}))
+    client.get(reverse('content-view', kwargs={'content_id': 0}))
+
+    assert pageviews.get_pending_views() == {('content-view', content.id): 3, ('user', create_user_profile.user_id): 1}
+    assert UserContent.objects.get(id=content.id).view_count == 0
+
+    assert pageviews.flush_views() == 4
+    assert pageviews.get_pending_views() == {}
+    assert UserContent.objects.get(id=content.id).view_count == 3
+    assert UserContent.objects.get(id=other.id).view_count == 0
+    assert UserProfile.objects.get(id=create_user_profile.id).view_count == 1
+
+
+@pytest.mark.django_db
+def test_flushes_add_to_stored_counts(view_buffer, settings, create_test_category_with_content):
+    content, other = create_test_category_with_content
+    # Another worker has flushed its views already.
+    UserContent.objects.filter(id=content.id).update(view_count=5)
+    settings.PAGE_VIEW_BATCH_SIZE = 1
+    for content_id in (content.id, content.id, other.id):
+        pageviews.record_view('content-view', content_id)
+    pageviews.flush_views()
+
+    assert UserContent.objects.get(id=content.id).view_count == 7
+    assert UserContent.objects.get(id=other.id).view_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_buffer_is_flushed_at_threshold_in_background(view_buffer, settings, create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    settings.PAGE_VIEW_FLUSH_THRESHOLD = 2
+    pageviews.record_view('content-view', content.id)
+    assert UserContent.objects.get(id=content.id).view_count == 0
+    pageviews.record_view('content-view', content.id)
+
+    deadline = time.monotonic() + 5
+    while UserContent.objects.get(id=content.id).view_count != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert UserContent.objects.get(id=content.id).view_count == 2
+    assert pageviews.get_pending_views() == {}
+
+
+@pytest.mark.django_db
+def test_category_lists_most_viewed_first(client, view_buffer, create_test_category_with_content):
+    content, other = create_test_category_with_content
+    UserContent.objects.filter(id=other.id).update(view_count=10)
+    response = client.get(reverse('category', kwargs={'category': 'Test'}))
+    assert list(response.context['contents']) == [other, content]
+
+
+@pytest.mark.django_db
+def test_profile_saves_keep_flushed_counts(client, view_buffer, create_user_profile):
+    profile = UserProfile.objects.get(id=create_user_profile.id)
+    UserProfile.objects.filter(id=profile.id).update(view_count=7, follower_count=3)
+    profile.about = 'Changed'
+    profile.save()
+    client.login(username='testuser', password='testpassword')
+
+    profile.refresh_from_db()
+    assert (profile.about, profile.view_count, profile.follower_count) == ('Changed', 7, 3)
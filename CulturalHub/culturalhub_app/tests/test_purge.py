@@ -0,0 +1,101 @@
+import pytest
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.urls import reverse
+
+from culturalhub_app.admin import UserContentAdmin
+from culturalhub_app.feed import process_feed_events
+from culturalhub_app.models import (UserContent, Comment, Interest, RatingVote, Follow, FeedItem, FeedEvent,
+                                    CommentNotification)
+from culturalhub_app.purge import purge_deleted_content
+
+
+@pytest.fixture
+def discussed_content(create_test_category_with_content, create_user_profile):
+    """
+    Content with nested comments, votes, interests, feed items and notifications, next to an untouched item.
+    """
+    content, other = create_test_category_with_content
+    reader = User.objects.create_user(username='reader', password='testpassword').userprofile
+    Follow.objects.create(follower=reader, author=create_user_profile)
+    content.interests.add(Interest.objects.create(name='Opera'))
+    other.interests.add(Interest.objects.get(name='Opera'))
+    RatingVote.cast(reader, content, 4)
+    RatingVote.cast(reader, other, 4)
+
+    parent = None
+    for i in range(7):
+        parent = Comment.objects.create(user=reader, commented_content=content, text=f'comment {i}',
+                                        parent=parent if i % 2 else None)
+    Comment.objects.create(user=reader, commented_content=other, text='other')
+    process_feed_events()
+    Comment.objects.create(user=reader, commented_content=content, text='not fanned out yet')
+    return content, other
+
+
+def related_rows(content):
+    return {
+        'comments': Comment.objects.filter(commented_content=content).count(),
+        'votes': RatingVote.objects.filter(content=content).count(),
+        'interests': UserContent.interests.through.objects.filter(usercontent_id=content.id).count(),
+        'feed_items': FeedItem.objects.filter(content=content).count(),
+        'feed_events': FeedEvent.objects.filter(content=content).count(),
+        'notifications': CommentNotification.objects.filter(comment__commented_content=content).count(),
+    }
+
+
+@pytest.mark.django_db
+def test_delete_view_hides_content(client, discussed_content, create_user_profile):
+    content, other = discussed_content
+    client.force_login(create_user_profile.user)
+    response = client.post(reverse('content-delete', kwargs={'pk': content.id}))
+    assert response.status_code == 302
+
+    assert UserContent.all_objects.get(id=content.id).deleted_at is not None
+    assert list(UserContent.objects.all()) == [other]
+    assert client.get(reverse('content-view', kwargs={'content_id': content.id})).status_code == 302
+
+
+@pytest.mark.django_db
+def test_delete_view_requires_owner(client, discussed_content):
+    content = discussed_content[0]
+    client.force_login(User.objects.get(username='reader'))
+    client.post(reverse('content-delete', kwargs={'pk': content.id}))
+    assert UserContent.objects.filter(id=content.id).exists()
+
+
+@pytest.mark.django_db
+def test_purge_leaves_no_orphans(discussed_content):
+    content, other = discussed_content
+    other_rows = related_rows(other)
+    assert all(related_rows(content).values())
+
+    content.soft_delete()
+    assert purge_deleted_content(grace_period=3600) == 0
+    assert purge_deleted_content(batch_size=2, grace_period=0) == 1
+
+    assert not UserContent.all_objects.filter(id=content.id).exists()
+    assert not any(related_rows(content).values())
+    assert not Comment.objects.filter(parent__isnull=False, parent__commented_content=content).exists()
+    assert related_rows(other) == other_rows
+
+
+@pytest.mark.django_db
+def test_admin_bulk_delete_uses_soft_delete(discussed_content):
+    content, other = discussed_content
+    model_admin = UserContentAdmin(UserContent, admin.site)
+    request = RequestFactory().post('/')
+    request.user = User.objects.create_superuser(username='admin', password='adminpassword')
+    request.session = {}
+    request._messages = FallbackStorage(request)
+
+    assert 'delete_selected' not in model_admin.get_actions(request)
+    model_admin.soft_delete_selected(request, UserContent.objects.all())
+    assert not UserContent.objects.exists()
+
+    call_command('purge_deleted_content', grace_period=0, verbosity=0)
+    assert not UserContent.all_objects.exists()
+    assert not Comment.objects.exists()
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from culturalhub_app.models import RatingVote, UserContent
+
+
+@pytest.fixture
+def voters():
+    return [User.objects.create_user(username=f'voter{i}', password='testpassword').userprofile for i in range(3)]
+
+
+@pytest.mark.django_db
+def test_votes_update_aggregates_incrementally(settings, voters, create_test_category_with_content):
+    settings.RATING_PRIOR_MEAN = 3.0
+    settings.RATING_PRIOR_WEIGHT = 2
+    content = create_test_category_with_content[0]
+
+    RatingVote.cast(voters[0], content, 5)
+    RatingVote.cast(voters[1], content, 4)
+    content.refresh_from_db()
+    assert (content.rating_sum, content.rating_count, content.rating) == (9, 2, Decimal('4.50'))
+    assert content.score == pytest.approx((9 + 2 * 3.0) / 4)
+
+    RatingVote.cast(voters[0], content, 1)
+    content.refresh_from_db()
+    assert (content.rating_sum, content.rating_count, content.rating) == (5, 2, Decimal('2.50'))
+    assert RatingVote.objects.filter(content=content).count() == 2
+
+
+@pytest.mark.django_db
+def test_deleted_vote_is_subtracted(voters, create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    RatingVote.cast(voters[0], content, 5)
+    voters[0].user.delete()
+
+    content.refresh_from_db()
+    assert (content.rating_sum, content.rating_count, content.rating) == (0, 0, None)
+
+
+@pytest.mark.django_db
+def test_rate_view_and_top_rated(client, voters, create_test_category_with_content):
+    content1, content2 = create_test_category_with_content
+    RatingVote.cast(voters[0], content1, 5)
+    for voter in voters:
+        RatingVote.cast(voter, content2, 4)
+
+    client.force_login(voters[0].user)
+    response = client.post(reverse('rate-content', kwargs={'content_id': content2.id}), {'value': 5})
+    assert response.status_code == 302
+    assert UserContent.objects.get(id=content2.id).rating_sum == 13
+
+    response = client.get(reverse('main-page'))
+    assert response.context['top_rated_content'] == content2
+
+
+@pytest.mark.django_db
+def test_latest_content_does_not_need_votes(client, create_test_category_with_content):
+    response = client.get(reverse('main-page'))
+    assert response.context['latest_content'] == create_test_category_with_content[1]
+    assert response.context['top_rated_content'] is None
+
+
+@pytest.mark.django_db
+def test_rate_view_rejects_invalid_value(client, voters, create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    client.force_login(voters[0].user)
+    client.post(reverse('rate-content', kwargs={'content_id': content.id}), {'value': 9})
+    assert not RatingVote.objects.exists()
+
+
+@pytest.mark.django_db
+def test_unvoted_content_starts_at_the_prior(settings, voters, create_test_category_with_content):
+    settings.RATING_PRIOR_MEAN = 3.0
+    content, other = create_test_category_with_content
+    assert UserContent.objects.get(id=content.id).score == 3.0
+
+    RatingVote.cast(voters[0], content, 1)
+    UserContent.objects.filter(id=other.id).update(score=0)
+    call_command('recompute_scores')
+    assert list(UserContent.objects.order_by('-score')) == [other, content]
+    assert UserContent.objects.get(id=other.id).score == 3.0
+
+
+@pytest.mark.django_db
+def test_saving_content_keeps_votes_and_views(voters, create_test_category_with_content):
+    content = UserContent.objects.get(id=create_test_category_with_content[0].id)
+    RatingVote.cast(voters[0], content, 5)
+    UserContent.objects.filter(id=content.id).update(view_count=7)
+    content.title = 'edited'
+    content.save()
+
+    content.refresh_from_db()
+    assert (content.title, content.rating_sum, content.rating_count, content.view_count) == ('edited', 5, 1, 7)
+    assert content.score > 3.0
@@ -0,0 +1,127 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from culturalhub_app.models import UserContent, ContentRevision, Interest
+from culturalhub_app.revisions import (apply_delta, make_delta, edited_by, latest_revisions, get_revision_texts,
+                                       record_revisions)
+
+DESCRIPTION = ' '.join(f'Sentence number {i} of a long description about a concert.' for i in range(200))
+
+
+@pytest.fixture
+def editable_content(create_test_category_with_content):
+    content = create_test_category_with_content[0]
+    # Written without recording a revision, as if the content was created like this.
+    UserContent.objects.filter(id=content.id).update(description=DESCRIPTION, culture='Polish')
+    content.refresh_from_db()
+    content.interests.add(Interest.objects.create(name='Music'))
+    return content
+
+
+def edit(content, title, description):
+    content.title, content.description = title, description
+    edited_by(content, content.author).save()
+
+
+def test_delta_round_trip():
+    old = 'The quick brown fox jumps over the lazy dog'
+    new = 'The quick red fox leaps over the lazy dog today'
+    assert apply_delta(new, make_delta(new, old)) == old
+    assert apply_delta('anything', make_delta(new, old, full=True)) == old
+    assert apply_delta(new, make_delta(new, '')) == ''
+
+
+def test_small_edits_store_small_deltas():
+    new = DESCRIPTION.replace('number 100 ', 'number one hundred ')
+    delta = make_delta(new, DESCRIPTION)
+    assert len(delta) < 60
+    assert len(delta) <= len(make_delta(new, DESCRIPTION, full=True))
+
+
+@pytest.mark.django_db
+def test_every_revision_can_be_restored(settings, editable_content):
+    settings.REVISION_KEYFRAME_INTERVAL = 4
+    versions = [(editable_content.title, editable_content.description)]
+    for i in range(10):
+        versions.append((f'Title {i}', DESCRIPTION.replace(f'number {i} ', f'number {i} (edited {i}) ')))
+        edit(editable_content, *versions[-1])
+    assert list(ContentRevision.objects.filter(keyframe=True).values_list('number', flat=True)) == [4, 8]
+
+    for number in range(1, 11):
+        assert get_revision_texts(editable_content, number) == (versions[number - 1], versions[number])
+    assert [revision.number for revision in latest_revisions(editable_content, 3)] == [10, 9, 8]
+    assert [revision.number for revision in latest_revisions(editable_content, 3, before=8)] == [7, 6, 5]
+
+
+@pytest.mark.django_db
+def test_history_is_bounded(settings, editable_content):
+    settings.REVISION_HISTORY_LIMIT = 3
+    versions = [(editable_content.title, editable_content.description)]
+    for i in range(6):
+        versions.append((f'Title {i}', editable_content.description))
+        edit(editable_content, *versions[-1])
+    edit(editable_content, editable_content.title, editable_content.description)
+
+    assert list(editable_content.revisions.order_by('number').values_list('number', flat=True)) == [4, 5, 6]
+    assert get_revision_texts(editable_content, 4)[0] == versions[3]
+    with pytest.raises(ContentRevision.DoesNotExist):
+        get_revision_texts(editable_content, 3)
+
+
+@pytest.mark.django_db
+def test_edit_view_records_history_and_restores(client, editable_content):
+    client.force_login(editable_content.author.user)
+    data = {'title': 'Vandalized', 'description': 'spam', 'culture': 'Polish',
+            'category': editable_content.category_id, 'interests': [editable_content.interests.get().id]}
+    assert client.post(reverse('edit-content', kwargs={'content_id': editable_content.id}), data).status_code == 302
+
+    history = client.get(reverse('content-history', kwargs={'content_id': editable_content.id}))
+    assert [revision.number for revision in history.context['revisions']] == [1]
+    response = client.get(reverse('revision-diff', kwargs={'content_id': editable_content.id, 'number': 1}))
+    assert ('delete', 'content1') in response.context['title_diff']
+    assert ('insert', 'Vandalized') in response.context['title_diff']
+
+    client.post(reverse('restore-revision', kwargs={'content_id': editable_content.id, 'number': 1}))
+    restored = UserContent.objects.get(id=editable_content.id)
+    assert (restored.title, restored.description) == ('content1', DESCRIPTION)
+    assert restored.revisions.count() == 2
+
+
+@pytest.mark.django_db
+def test_only_the_author_can_restore(client, editable_content):
+    edit(editable_content, 'New title', DESCRIPTION)
+    client.force_login(User.objects.create_user(username='vandal', password='testpassword'))
+    response = client.post(reverse('restore-revision', kwargs={'content_id': editable_content.id, 'number': 1}))
+    assert response.status_code == 403
+    assert UserContent.objects.get(id=editable_content.id).title == 'New title'
+
+
+@pytest.mark.django_db
+def test_unrecorded_changes_break_the_chain(editable_content):
+    edit(editable_content, 'alpha beta', DESCRIPTION)
+    editable_content.title = 'gamma delta'
+    editable_content.save()
+    assert get_revision_texts(editable_content, 1)[0] == ('content1', DESCRIPTION)
+    assert get_revision_texts(editable_content, 2) == (('alpha beta', DESCRIPTION), ('gamma delta', DESCRIPTION))
+    assert editable_content.revisions.get(number=1).editor == editable_content.author
+    assert editable_content.revisions.get(number=2).editor is None
+
+    UserContent.objects.filter(id=editable_content.id).update(title='totally different gamma here now')
+    editable_content.refresh_from_db()
+    for number in (1, 2):
+        with pytest.raises(ContentRevision.DoesNotExist):
+            get_revision_texts(editable_content, number)
+
+    # Edits after the break are restorable again.
+    edit(editable_content, 'epsilon', DESCRIPTION)
+    assert get_revision_texts(editable_content, 3)[0] == ('totally different gamma here now', DESCRIPTION)
+
+
+@pytest.mark.django_db
+def test_bulk_updates_are_recorded_explicitly(editable_content):
+    old = (editable_content.title, editable_content.description)
+    UserContent.objects.filter(id=editable_content.id).update(title='bulk')
+    editable_content.title = 'bulk'
+    record_revisions([(editable_content, *old)], editable_content.author)
+    assert get_revision_texts(editable_content, 1) == (old, ('bulk', DESCRIPTION))
@@ -0,0 +1,72 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+
+from culturalhub_app.models import Comment, StaleSnapshot
+from culturalhub_app.snapshots import read_snapshot, regenerate_stale_snapshots, snapshot_file
+
+
+@pytest.fixture
+def snapshot_settings(settings, tmp_path):
+    settings.SNAPSHOT_ROOT = tmp_path
+    settings.SNAPSHOT_WORKERS = 0
+    return settings
+
+
+@pytest.fixture
+def rendered(snapshot_settings, create_test_category_with_content):
+    call_command('generate_snapshots', all=True, stdout=None)
+    return create_test_category_with_content
+
+
+def stale_paths():
+    return set(StaleSnapshot.objects.values_list('path', flat=True))
+
+
+@pytest.mark.django_db
+def test_generate_renders_public_pages(rendered, create_user_profile):
+    content = rendered[0]
+    for path in (reverse('category', kwargs={'category': 'Test'}),
+                 reverse('content-view', kwargs={'content_id': content.id}),
+                 reverse('user', kwargs={'user_id': create_user_profile.user_id})):
+        assert b'content1' in read_snapshot(path)
+    assert not StaleSnapshot.objects.exists()
+
+
+@pytest.mark.django_db
+def test_anonymous_requests_are_served_from_snapshots(client, rendered, create_user_profile):
+    path = reverse('content-view', kwargs={'content_id': rendered[0].id})
+    with open(snapshot_file(path), 'wb') as snapshot:
+        snapshot.write(b'<p>snapshot</p>')
+
+    assert client.get(path).content == b'<p>snapshot</p>'
+    assert b'snapshot' not in client.get(path, {'page': 1}).content
+
+    client.force_login(create_user_profile.user)
+    assert b'Rate' in client.get(path).content
+
+
+@pytest.mark.django_db
+def test_changes_regenerate_only_affected_pages(rendered, django_capture_on_commit_callbacks):
+    content, other = rendered
+    reader = User.objects.create_user(username='reader', password='testpassword').userprofile
+    StaleSnapshot.objects.all().delete()
+    content_path = reverse('content-view', kwargs={'content_id': content.id})
+    other_path = reverse('content-view', kwargs={'content_id': other.id})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(user=reader, commented_content=content, text='Fresh comment')
+    assert stale_paths() == {content_path}
+    assert read_snapshot(content_path) is None
+    assert regenerate_stale_snapshots() == 1
+    assert b'Fresh comment' in read_snapshot(content_path)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        content.soft_delete()
+    assert stale_paths() == {content_path, reverse('category', kwargs={'category': 'Test'}),
+                             reverse('user', kwargs={'user_id': content.author.user_id})}
+    regenerate_stale_snapshots()
+    assert read_snapshot(content_path) is None
+    assert b'content1' not in read_snapshot(reverse('category', kwargs={'category': 'Test'}))
+    assert read_snapshot(other_path) is not None
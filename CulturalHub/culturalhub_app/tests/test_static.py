@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from culturalhub_app.middleware import CompressionMiddleware
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    (source / 'site.css').write_text('body { color: black; }\n' * 200)
+    settings.STATICFILES_DIRS = [*settings.STATICFILES_DIRS, source]
+    settings.STATIC_ROOT = tmp_path / 'collected'
+    call_command('collectstatic', interactive=False, verbosity=0)
+
+    manifest = json.loads((settings.STATIC_ROOT / 'staticfiles.json').read_text())
+    return settings.STATIC_ROOT, manifest['paths']
+
+
+def test_collectstatic_fingerprints_and_compresses(collected):
+    root, paths = collected
+    assert paths['logo.png'] != 'logo.png'
+    assert (root / paths['site.css']).exists()
+    assert gzip.decompress((root / (paths['site.css'] + '.gz')).read_bytes()) == (root / 'site.css').read_bytes()
+    assert not (root / (paths['logo.png'] + '.gz')).exists()
+
+
+def test_static_view_serves_precompressed_file(client, collected):
+    root, paths = collected
+    url = reverse('static', kwargs={'path': paths['site.css']})
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Type'] == 'text/css'
+    assert response['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert gzip.decompress(b''.join(response.streaming_content)).startswith(b'body')
+
+    response = client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0')
+    assert not response.has_header('Content-Encoding')
+
+    response = client.get(reverse('static', kwargs={'path': 'site.css'}))
+    assert response['Cache-Control'] == 'public, max-age=3600'
+    assert client.get(reverse('static', kwargs={'path': '../manage.py'})).status_code == 404
+
+
+def test_compression_middleware_threshold(settings):
+    settings.COMPRESSION_MIN_SIZE = 100
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+    small = CompressionMiddleware(lambda request: HttpResponse('<p>hi</p>'))(request)
+    assert not small.has_header('Content-Encoding')
+    assert small['Vary'] == 'Accept-Encoding'
+
+    body = '<p>Welcome to CulturalHub!</p>' * 50
+    large = CompressionMiddleware(lambda request: HttpResponse(body))(request)
+    assert large['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(large.content).decode() == body
+
+    image = CompressionMiddleware(lambda request: HttpResponse(b'x' * 500, content_type='image/png'))(request)
+    assert not image.has_header('Content-Encoding')
+
+
+@pytest.mark.parametrize('encoding', ['gzip', 'br'])
+def test_compressed_responses_are_padded(settings, encoding):
+    decompress = gzip.decompress if encoding == 'gzip' else pytest.importorskip('brotli').decompress
+    settings.COMPRESSION_MIN_SIZE = 100
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+    body = '<input name="csrfmiddlewaretoken" value="secret">' * 50
+    middleware = CompressionMiddleware(lambda request: HttpResponse(body))
+
+    responses = [middleware(request) for _ in range(20)]
+    assert {response['Content-Encoding'] for response in responses} == {encoding}
+    assert {decompress(response.content).decode() for response in responses} == {body}
+    assert len({len(response.content) for response in responses}) > 1
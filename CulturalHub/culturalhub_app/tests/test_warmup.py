@@ -0,0 +1,47 @@
+import pytest
+
+from culturalhub_app.startup_profiler import parse_importtime, group_by_package, ModuleTiming
+from culturalhub_app import warmup
+from culturalhub_app.warmup import warm_up
+
+
+@pytest.mark.django_db
+def test_warm_up_runs_all_steps():
+    timings = warm_up()
+    assert list(timings) == ['urls', 'templates', 'database', 'lookups']
+    assert all(result for seconds, result in timings.values())
+    assert timings['lookups'][1] > 200
+
+
+@pytest.mark.django_db
+def test_warm_up_can_close_connections(monkeypatch):
+    closed = []
+    monkeypatch.setattr(warmup.connections, 'close_all', lambda: closed.append(True))
+    warm_up(['lookups'])
+    assert not closed
+    warm_up(['lookups'], keep_connections=False)
+    assert closed == [True]
+
+
+def test_failing_step_does_not_stop_warm_up(monkeypatch):
+    monkeypatch.setitem(warmup.STEPS, 'urls', lambda: 1 / 0)
+    timings = warm_up(['urls', 'templates'])
+    assert timings['urls'][1] is None
+    assert timings['templates'][1] > 0
+
+
+def test_parse_importtime():
+    output = '\n'.join([
+        'import time: self [us] | cumulative | imported package',
+        'import time:       120 |        120 |     django.utils',
+        'import time:       300 |        420 |   django',
+        'import time:        80 |         80 | json',
+        'some other output',
+    ])
+    timings = parse_importtime(output)
+    assert timings == [
+        ModuleTiming('django.utils', 120, 120, 2),
+        ModuleTiming('django', 300, 420, 1),
+        ModuleTiming('json', 80, 80, 0),
+    ]
+    assert group_by_package(timings) == {'django': 420, 'json': 80}
@@ -0,0 +1,29 @@
+import os
+
+from PIL import Image, ImageOps
+
+# This module is imported by the thumbnail process pool workers, so it must not depend on Django.
+
+
+def render_thumbnails(source_path, targets):
+    """
+    Renders fixed-size thumbnails of an image.
+
+    :param source_path: Path of the original image.
+    :param targets: List of (target_path, (width, height)) tuples. Existing targets are skipped.
+    :return: List of the rendered target paths.
+    """
+    rendered = []
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for target_path, size in targets:
+            if os.path.exists(target_path):
+                continue
+            thumbnail = ImageOps.fit(image, tuple(size), Image.LANCZOS)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            # Write to a temporary file first, so a half written thumbnail is never served.
+            temporary_path = f'{target_path}.{os.getpid()}.tmp'
+            thumbnail.save(temporary_path, 'JPEG', quality=85, optimize=True)
+            os.replace(temporary_path, target_path)
+            rendered.append(target_path)
+    return rendered
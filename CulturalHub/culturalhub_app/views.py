@@ -1,21 +1,59 @@
+import json
+import mimetypes
+import os
+from collections import Counter
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.models import User
-from django.core.exceptions import PermissionDenied
-from django.http import HttpResponseForbidden
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, FileResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
 from django.views.generic import CreateView, DeleteView, TemplateView
-from django.urls import reverse_lazy
-from culturalhub_app.models import UserProfile, Category, UserContent, Comment
-from culturalhub_app.forms import RegistrationForm, UserProfileForm, ContentEditForm, CommentForm
+from django.urls import reverse_lazy, reverse
+from django.utils.http import urlencode, http_date
+from django.utils.dateparse import parse_datetime
+from django.utils._os import safe_join
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.views.static import was_modified_since
+from culturalhub_app.models import UserProfile, Category, UserContent, Comment, RatingVote, Follow, ContentRevision
+from culturalhub_app.forms import RegistrationForm, UserProfileForm, ContentEditForm, CommentForm, RatingVoteForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import logout, login
-from django.db.models import Q
+from django.db import transaction, IntegrityError
+from django.db.models import Q, F
+from culturalhub_app import autocomplete
+from culturalhub_app.batch import save_content_batch
+from culturalhub_app.duplicates import find_duplicates
+from culturalhub_app.feed import get_feed, feed_cursor
+from culturalhub_app.images import thumbnail_name, schedule_thumbnails
+from culturalhub_app.revisions import edited_by, latest_revisions, get_revision_texts, diff
+from culturalhub_app.storage import image_storage
+from culturalhub_app.compression import ENCODINGS, accepted_encodings
 
 
 # Create your views here.
 
+THREADS_PER_PAGE = 20
+THREAD_PREVIEW_DEPTH = 1
+THREAD_PREVIEW_REPLIES = 3
+COMMENTS_PER_THREAD_PAGE = 50
+
+
+def mark_hidden_replies(comments):
+    """
+    Sets the indent of each comment and the number of its replies that were not fetched,
+    so the template can offer to expand the collapsed part of the thread.
+    """
+    shown = Counter(comment.parent_id for comment in comments)
+    for comment in comments:
+        comment.indent = comment.depth
+        comment.hidden_replies = comment.reply_count - shown[comment.id]
+    return comments
+
 
 class LoginView(View):
     """
@@ -89,8 +127,8 @@ class MainPageView(View):
         """
         categories = Category.objects.all()
         user = request.user
-        latest_content = UserContent.objects.exclude(rating=None).order_by('-date').first()
-        top_rated_content = UserContent.objects.exclude(rating=None).order_by('-rating').first()
+        latest_content = UserContent.objects.order_by(F('created_at').desc(nulls_last=True), '-id').first()
+        top_rated_content = UserContent.objects.filter(rating_count__gt=0).order_by('-score').first()
         ctx = {
             'categories': categories,
             'user': user,
@@ -122,9 +160,13 @@ class UserProfileView(View):
                     grouped_contents[category] = []
                 grouped_contents[category].append(content)
 
+            is_following = (request.user.is_authenticated and
+                            Follow.objects.filter(follower__user=request.user, author=user_profile).exists())
+
             ctx = {
                 'user_profile': user_profile,
-                'grouped_contents': grouped_contents
+                'grouped_contents': grouped_contents,
+                'is_following': is_following,
             }
 
             return render(request, 'user_profile.html', ctx)
@@ -169,7 +211,7 @@ class UserProfileEditView(View, LoginRequiredMixin):
         if request.user.is_authenticated:
             user = get_object_or_404(User, id=user_id)
             user_profile = user.userprofile
-            form = UserProfileForm(request.POST, instance=user_profile)
+            form = UserProfileForm(request.POST, request.FILES, instance=user_profile)
 
             if form.is_valid():
                 request.user.first_name = form.cleaned_data['first_name']
@@ -184,6 +226,68 @@ class UserProfileEditView(View, LoginRequiredMixin):
             return redirect('login')
 
 
+class FollowView(LoginRequiredMixin, View):
+    """
+    View for following and unfollowing other users.
+    """
+    def post(self, request, user_id):
+        """
+        Handles POST requests, following the user if the logged-in user doesn't follow them yet, unfollowing otherwise.
+
+        :param user_id: ID of the user to follow or unfollow.
+        """
+        author = get_object_or_404(UserProfile, user=user_id)
+        follower = request.user.userprofile
+        if author == follower:
+            messages.error(request, "You can't follow yourself.")
+            return redirect('user', user_id=user_id)
+
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=follower, author=author).delete()
+            if deleted:
+                UserProfile.objects.filter(pk=author.pk).update(follower_count=F('follower_count') - 1)
+                messages.success(request, f"You no longer follow {author}.")
+            else:
+                try:
+                    with transaction.atomic():
+                        Follow.objects.create(follower=follower, author=author)
+                except IntegrityError:
+                    return redirect('user', user_id=user_id)
+                UserProfile.objects.filter(pk=author.pk).update(follower_count=F('follower_count') + 1)
+                messages.success(request, f"You now follow {author}.")
+        return redirect('user', user_id=user_id)
+
+
+class FeedView(LoginRequiredMixin, View):
+    """
+    View for displaying the activity feed of the logged-in user: new content from followed authors,
+    new content matching their interests and new comments.
+    """
+    def get(self, request):
+        """
+        Handles GET requests for a page of the feed.
+        The page is selected with the 'before' parameter holding the cursor of the last item of the previous page,
+        as "time,merged,id".
+        """
+        try:
+            created_at, pulled, pk = request.GET['before'].rsplit(',', 2)
+            before = (parse_datetime(created_at), pulled == '1', int(pk))
+        except (KeyError, ValueError):
+            before = None
+        if before is not None and before[0] is None:
+            before = None
+        items = get_feed(request.user.userprofile, before=before)
+        next_before = None
+        if len(items) == settings.FEED_PAGE_SIZE:
+            created_at, pulled, pk = feed_cursor(items[-1])
+            next_before = f'{created_at.isoformat()},{int(pulled)},{pk}'
+        ctx = {
+            'items': items,
+            'next_before': next_before,
+        }
+        return render(request, 'feed.html', ctx)
+
+
 class CategoryContentView(View):
     """
     view responsible for handling GET requests to display contents belonging to a specific category.
@@ -198,7 +302,7 @@ class CategoryContentView(View):
         """
         try:
             category_obj = Category.objects.get(name=category)
-            contents = UserContent.objects.filter(category__name=category)
+            contents = UserContent.objects.filter(category=category_obj).order_by('-view_count', 'id')
 
             ctx = {
                 'contents': contents,
@@ -226,15 +330,24 @@ class ContentView(View):
         try:
             content = UserContent.objects.get(id=content_id)
             category = content.category
-            comments = Comment.objects.filter(commented_content=content)
+            threads_page = Paginator(Comment.objects.roots(content), THREADS_PER_PAGE).get_page(request.GET.get('page'))
+            comments = list(Comment.objects.threads(
+                list(threads_page), max_depth=THREAD_PREVIEW_DEPTH, replies_per_thread=THREAD_PREVIEW_REPLIES,
+            ).select_related('user__user'))
+            mark_hidden_replies(comments)
 
             form = CommentForm()
+            user_vote = None
+            if request.user.is_authenticated:
+                user_vote = RatingVote.objects.filter(user__user=request.user, content=content).first()
 
             ctx = {
                 'content': content,
                 'category': category,
                 'comments': comments,
-                'form': form
+                'threads_page': threads_page,
+                'form': form,
+                'rating_form': RatingVoteForm(instance=user_vote),
             }
             return render(request, 'content.html', ctx)
         except UserContent.DoesNotExist:
@@ -248,7 +361,7 @@ class ContentCreateView(LoginRequiredMixin, CreateView):
     This view requires users to be logged in, as indicated by the LoginRequiredMixin.
     """
     model = UserContent
-    fields = ['title', 'description', 'date', 'location', 'category', 'interests', 'culture', 'rating']
+    fields = ['title', 'description', 'date', 'location', 'category', 'interests', 'culture', 'image']
     template_name = 'create_content.html'
     login_url = 'login'
 
@@ -258,9 +371,19 @@ class ContentCreateView(LoginRequiredMixin, CreateView):
         This method is called when the form is successfully validated. It saves the content object to the database
         and assigns the current user's UserProfile as the author. After saving, it redirects the user to the category
         page associated with the created content.
+        Content similar to existing content is rejected with DUPLICATE_ACTION = 'block'; with 'warn' the form
+        is shown again with the similar items and is saved once the user confirms it.
         """
         content = form.save(commit=False)
         content.author = self.request.user.userprofile
+        duplicates = find_duplicates(content)
+        if duplicates:
+            if settings.DUPLICATE_ACTION == 'block':
+                form.add_error(None, 'Very similar content has already been shared.')
+                return self.render_to_response(self.get_context_data(form=form, duplicates=duplicates))
+            if not self.request.POST.get('confirm_duplicate'):
+                return self.render_to_response(self.get_context_data(form=form, duplicates=duplicates,
+                                                                     confirm_duplicate=True))
         content.save()
         category_name = content.category.name
         return redirect('category', category=category_name)
@@ -281,7 +404,7 @@ class EditContentView(LoginRequiredMixin, View):
             messages.error(request, "Content does not exist")
             return redirect('main-page')
 
-        if request.user == content.author.user:
+        if content.author.user_id == request.user.id:
             return render(request, 'edit_content.html', {'content': content, 'form': form})
         else:
             return HttpResponseForbidden("You do not have permission to edit this content.")
@@ -289,19 +412,117 @@ class EditContentView(LoginRequiredMixin, View):
     def post(self, request, content_id):
         """
         Handles POST requests to save changes made in the content editing form.
+        The previous title and description are kept in the revision history of the content.
         """
-        content = UserContent.objects.get(id=content_id)
-
-        if request.user == content.author.user:
-            form = ContentEditForm(request.POST, instance=content)
-            if form.is_valid():
-                form.save()
-                messages.success(request, "Content has been updated successfully.")
-                return redirect('content-view', content_id)
+        with transaction.atomic():
+            content = UserContent.objects.select_for_update().get(id=content_id)
+
+            if content.author.user_id == request.user.id:
+                form = ContentEditForm(request.POST, request.FILES, instance=edited_by(content, request.user.userprofile))
+                if form.is_valid():
+                    form.save()
+                    messages.success(request, "Content has been updated successfully.")
+                    return redirect('content-view', content_id)
+                else:
+                    return render(request, 'edit_content.html', {'content': content, 'form': form})
             else:
-                return render(request, 'edit_content.html', {'content': content, 'form': form})
-        else:
-            return HttpResponseForbidden("You do not have permission to edit this content.")
+                return HttpResponseForbidden("You do not have permission to edit this content.")
+
+
+class ContentHistoryView(View):
+    """
+    View listing the revisions of a content item, newest first.
+    """
+    def get(self, request, content_id):
+        """
+        Handles GET requests for the revision history.
+        Older revisions are paged with the 'before' parameter holding the lowest revision number of the previous page.
+        """
+        content = get_object_or_404(UserContent, id=content_id)
+        try:
+            before = int(request.GET['before'])
+        except (KeyError, ValueError):
+            before = None
+        revisions = latest_revisions(content, before=before)
+        has_older = bool(revisions) and content.revisions.filter(number__lt=revisions[-1].number).exists()
+        ctx = {
+            'content': content,
+            'revisions': revisions,
+            'has_older': has_older,
+        }
+        return render(request, 'content_history.html', ctx)
+
+
+class RevisionDiffView(View):
+    """
+    View showing what an edit of a content item changed.
+    """
+    def get(self, request, content_id, number):
+        """
+        Handles GET requests for the changes of one revision.
+
+        :param number: Number of the revision, i.e. of the edit.
+        """
+        content = get_object_or_404(UserContent, id=content_id)
+        try:
+            before, after = get_revision_texts(content, number)
+        except ContentRevision.DoesNotExist:
+            raise Http404("Revision does not exist.")
+        ctx = {
+            'content': content,
+            'revision': get_object_or_404(content.revisions.select_related('editor__user'), number=number),
+            'title_diff': diff(before[0], after[0]),
+            'description_diff': diff(before[1], after[1]),
+        }
+        return render(request, 'revision_diff.html', ctx)
+
+
+class RestoreRevisionView(LoginRequiredMixin, View):
+    """
+    View for rolling back the title and description of a content item to the state before one of its edits.
+    """
+    def post(self, request, content_id, number):
+        """
+        Handles POST requests restoring a revision. Only the author of the content can restore it;
+        the rollback is an edit itself, so it can be undone as well.
+        """
+        with transaction.atomic():
+            content = get_object_or_404(UserContent.objects.select_for_update(), id=content_id)
+            if content.author.user_id != request.user.id:
+                return HttpResponseForbidden("You do not have permission to edit this content.")
+            try:
+                (title, description), _ = get_revision_texts(content, number)
+            except ContentRevision.DoesNotExist:
+                raise Http404("Revision does not exist.")
+
+            content.title, content.description = title, description
+            edited_by(content, request.user.userprofile).save(update_fields=['title', 'description'])
+        messages.success(request, f"Content has been restored to revision {number}.")
+        return redirect('content-view', content_id)
+
+
+class ContentBatchView(LoginRequiredMixin, View):
+    """
+    JSON endpoint for creating and updating many content items of the logged-in user at once.
+    """
+    def post(self, request):
+        """
+        Handles POST requests with a JSON body {"items": [...]}. Each item holds the fields of the content edit form,
+        items with an "id" update that content item. The batch is saved in one transaction only if every item
+        is valid; otherwise nothing is saved and the errors are reported per item.
+        """
+        try:
+            items = json.loads(request.body)['items']
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({'error': 'Request body must be a JSON object with a list of items.'}, status=400)
+        if not isinstance(items, list) or not items:
+            return JsonResponse({'error': 'Items must be a non-empty list.'}, status=400)
+        if len(items) > settings.CONTENT_BATCH_MAX_ITEMS:
+            return JsonResponse({'error': f'At most {settings.CONTENT_BATCH_MAX_ITEMS} items can be saved at once.'},
+                                status=400)
+
+        saved, results = save_content_batch(request.user.userprofile, items)
+        return JsonResponse({'saved': saved, 'results': results}, status=200 if saved else 400)
 
 
 class DeleteContentView(LoginRequiredMixin, DeleteView):
@@ -311,16 +532,21 @@ class DeleteContentView(LoginRequiredMixin, DeleteView):
     model = UserContent
     template_name = 'content_confirm_delete.html'
     success_url = reverse_lazy('main-page')
+    # DELETE requests would bypass form_valid() and delete the content with all its comments synchronously.
+    http_method_names = ['get', 'post', 'head', 'options']
 
-    def delete(self, request, *args, **kwargs):
+    def form_valid(self, form):
         """
         Deletes the content object if the logged-in user is the owner.
+        The content is soft deleted, so it disappears immediately without waiting for its comments
+        to be deleted; purge_deleted_content removes the rows later.
         """
-        obj = self.get_object()
-        if obj and obj.author == self.request.user.userprofile:
-            return super().delete(request, *args, **kwargs)
+        if self.object.author_id == self.request.user.userprofile.id:
+            self.object.soft_delete()
+            messages.success(self.request, "Content has been deleted.")
+            return redirect(self.get_success_url())
         else:
-            messages.error(request, "You do not have permission to delete this content.")
+            messages.error(self.request, "You do not have permission to delete this content.")
             return redirect('main-page')
 
 
@@ -336,11 +562,65 @@ class AddCommentView(View):
         if form.is_valid():
             comment = form.save(commit=False)
             comment.user = request.user.userprofile
-            comment.commented_content = UserContent.objects.get(id=content_id)
+            comment.commented_content = get_object_or_404(UserContent, id=content_id)
+            if request.POST.get('parent'):
+                try:
+                    parent_id = int(request.POST['parent'])
+                except ValueError:
+                    return HttpResponseBadRequest('The parent comment must be given by its id.')
+                comment.parent = get_object_or_404(Comment, id=parent_id, commented_content_id=content_id)
             comment.save()
+            if comment.parent is not None:
+                return redirect('comment-thread', comment_id=comment.parent.id)
+        return redirect('content-view', content_id=content_id)
+
+
+class RateContentView(LoginRequiredMixin, View):
+    """
+    View for rating content.
+    Each user has one vote per content item, voting again replaces the previous vote.
+    """
+    def post(self, request, content_id):
+        """
+        Handles POST requests with the rating given by the logged-in user.
+        """
+        content = get_object_or_404(UserContent, id=content_id)
+        form = RatingVoteForm(request.POST)
+        if form.is_valid():
+            RatingVote.cast(request.user.userprofile, content, form.cleaned_data['value'])
+            messages.success(request, "Thank you for rating!")
+        else:
+            messages.error(request, "Rating must be a number from 1 to 5.")
         return redirect('content-view', content_id=content_id)
 
 
+class CommentThreadView(View):
+    """
+    View for displaying a whole comment thread.
+    Used to expand replies which are collapsed on the content page.
+    """
+    def get(self, request, comment_id):
+        """
+        Handles GET requests for displaying a comment with all of its replies, paginated in depth-first order.
+
+        :param comment_id: ID of the comment starting the thread.
+        """
+        root = get_object_or_404(Comment.objects.select_related('commented_content'), id=comment_id)
+        comments_page = Paginator(
+            Comment.objects.subtree(root).select_related('user__user'), COMMENTS_PER_THREAD_PAGE
+        ).get_page(request.GET.get('page'))
+        for comment in comments_page:
+            comment.indent = comment.depth - root.depth
+
+        ctx = {
+            'root': root,
+            'content': root.commented_content,
+            'comments_page': comments_page,
+            'form': CommentForm(),
+        }
+        return render(request, 'comment_thread.html', ctx)
+
+
 class SearchResultsView(TemplateView):
     """
     View for displaying search results.
@@ -367,5 +647,105 @@ class SearchResultsView(TemplateView):
         return context
 
 
+class AutocompleteView(View):
+    """
+    View returning search suggestions for the search box as JSON.
+    """
+    def get(self, request):
+        """
+        Handles GET requests for search suggestions.
+        Looks up the most popular content titles, usernames, categories and interests starting with the query.
+        """
+        query = request.GET.get('query', '').strip()
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 10)), autocomplete.MAX_RESULTS))
+        except ValueError:
+            limit = 10
+
+        results = []
+        for kind, pk, label, score in autocomplete.get_index().search(query, limit):
+            if kind == autocomplete.CONTENT:
+                url = reverse('content-view', kwargs={'content_id': pk})
+            elif kind == autocomplete.USER:
+                url = reverse('user', kwargs={'user_id': pk})
+            elif kind == autocomplete.CATEGORY:
+                url = reverse('category', kwargs={'category': label})
+            else:
+                url = f"{reverse('search-results')}?{urlencode({'query': label})}"
+            results.append({'type': autocomplete.KIND_NAMES[kind], 'id': pk, 'label': label, 'url': url})
+
+        return JsonResponse({'query': query, 'results': results})
+
 
+class ImageView(View):
+    """
+    View serving uploaded images and their thumbnails.
+    Stored images are named after the digest of their content, so responses can be cached forever.
+    """
+    def get(self, request, size, name):
+        """
+        Handles GET requests for an image in the given size ('original' or one of settings.THUMBNAIL_SIZES).
+        If the thumbnail has not been rendered yet, the original image is served with a short cache lifetime.
 
+        :param size: Name of the requested size.
+        :param name: Storage name of the original image.
+        """
+        if size != 'original' and size not in settings.THUMBNAIL_SIZES:
+            raise Http404("Unknown image size")
+        if not image_storage.exists(name):
+            raise Http404("Image does not exist")
+
+        cache_control = 'public, max-age=31536000, immutable'
+        if size != 'original':
+            if image_storage.exists(thumbnail_name(name, size)):
+                name = thumbnail_name(name, size)
+            else:
+                schedule_thumbnails(name)
+                cache_control = 'public, max-age=60'
+
+        response = FileResponse(image_storage.open(name, 'rb'))
+        response['Cache-Control'] = cache_control
+        return response
+
+
+class StaticFileView(View):
+    """
+    View serving collected static files when no web server is placed in front of the application.
+    Picks the precompressed variant written by collectstatic according to the Accept-Encoding header.
+    """
+    def get(self, request, path):
+        """
+        Handles GET requests for a static file.
+        Fingerprinted files are cached forever, files requested by their original name only for an hour.
+
+        :param path: Path of the file within STATIC_ROOT.
+        """
+        try:
+            full_path = safe_join(settings.STATIC_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404("Static file does not exist")
+        if not os.path.isfile(full_path):
+            raise Http404("Static file does not exist")
+
+        stat = os.stat(full_path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            return HttpResponseNotModified()
+
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        encoding = None
+        for accepted in accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            if os.path.isfile(full_path + ENCODINGS[accepted]):
+                encoding = accepted
+                full_path += ENCODINGS[accepted]
+                break
+
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if getattr(staticfiles_storage, 'is_fingerprinted', None) and staticfiles_storage.is_fingerprinted(path):
+            response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=3600'
+        return response
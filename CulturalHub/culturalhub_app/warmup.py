@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver
+from django_countries import countries
+
+from culturalhub_app import autocomplete
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def resolve_urls():
+    """
+    Compiles the regular expressions of all URL patterns and builds the reverse lookup tables of the resolvers.
+    Returns the number of compiled patterns.
+    """
+    compiled = 0
+    resolvers = [get_resolver()]
+    while resolvers:
+        resolver = resolvers.pop()
+        # Accessing the property populates the reverse lookup tables.
+        resolver.reverse_dict
+        for pattern in resolver.url_patterns:
+            pattern.pattern.regex
+            compiled += 1
+            if isinstance(pattern, URLResolver):
+                resolvers.append(pattern)
+    return compiled
+
+
+def compile_templates():
+    """
+    Loads and compiles every template of the template directories, so the cached template loader
+    holds them before the first request. Returns the number of compiled templates.
+    """
+    compiled = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            for root, _, files in os.walk(directory):
+                for file_name in files:
+                    if not file_name.endswith(TEMPLATE_EXTENSIONS):
+                        continue
+                    name = os.path.relpath(os.path.join(root, file_name), directory).replace(os.sep, '/')
+                    try:
+                        engine.get_template(name)
+                        compiled += 1
+                    except Exception:
+                        logger.exception('Template %s could not be compiled', name)
+    return compiled
+
+
+def open_connections():
+    """
+    Opens the connections to all configured databases. Connections belong to the calling thread: with
+    CONN_MAX_AGE they are kept open and reused by the requests served in this thread, i.e. by sync workers,
+    not by threaded or ASGI workers. Returns the number of opened connections.
+    """
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return len(connections.all())
+
+
+def preload_lookups():
+    """
+    Fills the lazily built lookup tables: django_countries' country names and codes, the content type cache,
+    the static files manifest and the search autocomplete index. They are shared by all threads of the worker,
+    but the queries open a connection of the calling thread. Returns the number of preloaded countries.
+    """
+    country_count = len(list(countries))
+    countries.alt_codes
+    ContentType.objects.get_for_models(*apps.get_models())
+    getattr(staticfiles_storage, 'hashed_files', None)
+    autocomplete.get_index()
+    return country_count
+
+
+STEPS = {
+    'urls': resolve_urls,
+    'templates': compile_templates,
+    'database': open_connections,
+    'lookups': preload_lookups,
+}
+
+
+def warm_up(steps=None, keep_connections=True):
+    """
+    Runs the warm-up steps of a worker, which should happen before it accepts traffic.
+    A failing step is logged and doesn't stop the others, so a worker always starts.
+
+    :param steps: Names of the steps to run, all STEPS by default.
+    :param keep_connections: Leave the database connections opened by the steps open. Only useful if the worker
+                             serves requests in the calling thread, otherwise they would stay open unused.
+    :return: Dict mapping the step names to (seconds, result) tuples; result is None for failed steps.
+    """
+    timings = {}
+    for name in steps or STEPS:
+        start = time.perf_counter()
+        try:
+            result = STEPS[name]()
+        except Exception:
+            logger.exception('Warm-up step %s failed', name)
+            result = None
+        timings[name] = (time.perf_counter() - start, result)
+    if not keep_connections:
+        connections.close_all()
+    logger.info('Worker warmed up: %s', ', '.join(f'{name} {seconds * 1000:.0f} ms'
+                                                  for name, (seconds, _) in timings.items()))
+    return timings
@@ -0,0 +1,27 @@
+# Gunicorn configuration, run with: gunicorn -c gunicorn.conf.py
+# (also used with uvicorn workers: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker CulturalHub.asgi)
+
+wsgi_app = 'CulturalHub.wsgi:application'
+
+
+def post_worker_init(worker):
+    """
+    Warms up each worker after it has loaded the application and before it accepts requests.
+    Database connections are only kept open in sync workers: other workers serve requests in other threads,
+    which can't use the connections of this one. The lookup tables are shared by all threads, so every
+    worker preloads them, closing the connection the queries opened afterwards.
+    """
+    from gunicorn.workers.sync import SyncWorker
+    from culturalhub_app.warmup import STEPS, warm_up
+    if isinstance(worker, SyncWorker):
+        warm_up()
+    else:
+        warm_up([name for name in STEPS if name != 'database'], keep_connections=False)
+
+
+def worker_exit(server, worker):
+    """
+    Writes the page views buffered by a worker before it exits.
+    """
+    from culturalhub_app.pageviews import flush_views
+    flush_views()